@@ -1,26 +1,33 @@
 from django.contrib import admin
+from django.contrib.admin.utils import unquote
+from django.db import router
+from django.db.models import Q
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
+from blog.exports import CSVExportMixin
+from blog.pagination import EstimatedCountPaginator
+from categories.models import Category
+from .analytics import daily_views, sparkline_points, top_referrers, unique_visitors
 from .models import Article, ArticleView, Advertisement, Vlog
-
-
-class ArticleViewInline(admin.TabularInline):
-    """Inline admin for ArticleView"""
-    model = ArticleView
-    extra = 0
-    readonly_fields = ('ip_address', 'user_agent', 'viewed_at')
-    can_delete = False
+from .publishing import publish, unpublish, update_content
 
 
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
     """Admin interface for Article model"""
     list_display = ('title', 'author', 'category', 'is_featured', 'is_published', 'published_date', 'view_count')
-    list_filter = ('is_featured', 'is_published', 'category', 'author', 'published_date')
+    list_filter = ('is_featured', 'is_published', 'is_scheduled', 'category', 'author', 'published_date')
+    list_select_related = ('author', 'category')
     search_fields = ('title', 'excerpt', 'content')
     prepopulated_fields = {'slug': ('title',)}
-    readonly_fields = ('created_date', 'updated_date', 'view_count')
+    autocomplete_fields = ('author', 'category')
+    readonly_fields = ('created_date', 'updated_date', 'view_count', 'bot_view_count', 'view_analytics')
     filter_horizontal = ()
-    inlines = [ArticleViewInline]
+    analytics_days = 30
+    hits_per_page = 50
     
     fieldsets = (
         ('Content', {
@@ -33,48 +40,163 @@ class ArticleAdmin(admin.ModelAdmin):
             'fields': ('featured_image',)
         }),
         ('Publishing', {
-            'fields': ('is_featured', 'is_published', 'published_date')
+            'fields': ('is_featured', 'is_published', 'published_date', 'is_scheduled'),
+            'description': 'Publishing with a future published date schedules the post; it goes live automatically at that time.'
         }),
         ('Metadata', {
-            'fields': ('created_date', 'updated_date', 'view_count'),
+            'fields': ('created_date', 'updated_date', 'view_count', 'bot_view_count'),
             'classes': ('collapse',)
         }),
+        ('Analytics', {
+            'fields': ('view_analytics',)
+        }),
     )
     
     actions = ['make_published', 'make_unpublished', 'make_featured', 'make_unfeatured']
     
+    def get_urls(self):
+        """Add the paginated raw hit list for a single article"""
+        urls = [
+            path(
+                '<path:object_id>/hits/',
+                self.admin_site.admin_view(self.view_hits),
+                name='articles_article_hits',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def view_analytics(self, obj):
+        """Aggregated view statistics for the last ``analytics_days`` days"""
+        if obj is None or obj.pk is None:
+            return '-'
+        days = daily_views(obj, self.analytics_days)
+        context = {
+            'article': obj,
+            'days': self.analytics_days,
+            'daily': days,
+            'window_views': sum(views for _day, views in days),
+            'points': sparkline_points([views for _day, views in days]),
+            'uniques': unique_visitors(obj, self.analytics_days),
+            'referrers': top_referrers(obj, self.analytics_days),
+            'hits_url': reverse('admin:articles_article_hits', args=[obj.pk]),
+        }
+        return render_to_string('admin/articles/article/view_analytics.html', context)
+    view_analytics.short_description = 'Views'
+    
+    def view_hits(self, request, object_id):
+        """List the raw ArticleView rows of one article, newest first"""
+        article = self.get_object(request, unquote(object_id))
+        if article is None or not self.has_view_or_change_permission(request, article):
+            raise Http404
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        offset = (page - 1) * self.hits_per_page
+        # One extra row tells us whether there is a next page without a COUNT(*).
+        hits = list(
+            ArticleView.objects.filter(article_id=article.pk)
+            .order_by('-viewed_at')
+            .only('ip_address', 'user_agent', 'referrer', 'viewed_at')[offset:offset + self.hits_per_page + 1]
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Views of "{article}"',
+            'article': article,
+            'hits': hits[:self.hits_per_page],
+            'page': page,
+            'has_next': len(hits) > self.hits_per_page,
+        }
+        return TemplateResponse(request, 'admin/articles/article/view_hits.html', context)
+    
     def make_published(self, request, queryset):
-        """Mark selected articles as published"""
-        updated = queryset.update(is_published=True)
+        """Mark selected articles as published, effective now"""
+        updated = publish(queryset)
         self.message_user(request, f'{updated} articles were successfully marked as published.')
     make_published.short_description = "Mark selected articles as published"
     
     def make_unpublished(self, request, queryset):
         """Mark selected articles as unpublished"""
-        updated = queryset.update(is_published=False)
+        updated = unpublish(queryset)
         self.message_user(request, f'{updated} articles were successfully marked as unpublished.')
     make_unpublished.short_description = "Mark selected articles as unpublished"
     
     def make_featured(self, request, queryset):
         """Mark selected articles as featured"""
-        updated = queryset.update(is_featured=True)
+        updated = update_content(queryset, is_featured=True)
         self.message_user(request, f'{updated} articles were successfully marked as featured.')
     make_featured.short_description = "Mark selected articles as featured"
     
     def make_unfeatured(self, request, queryset):
         """Mark selected articles as unfeatured"""
-        updated = queryset.update(is_featured=False)
+        updated = update_content(queryset, is_featured=False)
         self.message_user(request, f'{updated} articles were successfully marked as unfeatured.')
     make_unfeatured.short_description = "Mark selected articles as unfeatured"
 
 
+# Article ids per IN list sent to ANALYTICS_DATABASE
+ARTICLE_ID_CHUNK = 500
+
+
+def views_of(articles):
+    """A filter selecting the views of ``articles`` (an Article queryset)
+
+    A subquery when both tables share a database. Otherwise the ids are
+    resolved first and sent as ``ARTICLE_ID_CHUNK``-sized IN lists, OR-ed
+    together, which some databases need for long lists.
+    """
+    if router.db_for_read(ArticleView) == router.db_for_read(Article):
+        return Q(article_id__in=articles.values('pk'))
+    ids = list(articles.values_list('pk', flat=True))
+    condition = Q(pk__in=[])
+    for start in range(0, len(ids), ARTICLE_ID_CHUNK):
+        condition |= Q(article_id__in=ids[start:start + ARTICLE_ID_CHUNK])
+    return condition
+
+
+class ArticleCategoryFilter(admin.SimpleListFilter):
+    """Filter views by article category without joining the articles table"""
+    title = 'article category'
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        return Category.objects.values_list('pk', 'name')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(views_of(Article.objects.filter(category_id=self.value())))
+        return queryset
+
+
 @admin.register(ArticleView)
-class ArticleViewAdmin(admin.ModelAdmin):
+class ArticleViewAdmin(CSVExportMixin, admin.ModelAdmin):
     """Admin interface for ArticleView model"""
     list_display = ('article', 'ip_address', 'viewed_at')
-    list_filter = ('viewed_at', 'article__category')
-    search_fields = ('article__title', 'ip_address')
+    list_filter = ('viewed_at', ArticleCategoryFilter)
+    date_hierarchy = 'viewed_at'
+    search_fields = ('ip_address',)
     readonly_fields = ('article', 'ip_address', 'user_agent', 'viewed_at')
+    # No COUNT(*) or SELECT DISTINCT over millions of rows on every page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/large_change_list.html'
+    actions = ['export_csv']
+    # No article titles: articles may be in another database
+    export_fields = ('id', 'article_id', 'viewed_at', 'ip_address', 'referrer', 'user_agent')
+    # No JOIN on articles (they may be in another database); prefetch instead.
+    list_select_related = ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('article')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Also match article titles, looked up on the articles database"""
+        filtered = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            queryset |= filtered.filter(views_of(Article.objects.filter(title__icontains=search_term)))
+        return queryset, may_have_duplicates
     
     def has_add_permission(self, request):
         """Prevent adding new article views through admin"""
@@ -113,10 +235,12 @@ class AdvertisementAdmin(admin.ModelAdmin):
 class VlogAdmin(admin.ModelAdmin):
     """Admin interface for Vlog model"""
     list_display = ('title', 'author', 'category', 'is_featured', 'is_published', 'published_date', 'view_count')
-    list_filter = ('is_featured', 'is_published', 'category', 'author', 'published_date')
+    list_filter = ('is_featured', 'is_published', 'is_scheduled', 'category', 'author', 'published_date')
+    list_select_related = ('author', 'category')
     search_fields = ('title', 'description')
     prepopulated_fields = {'slug': ('title',)}
-    readonly_fields = ('created_date', 'updated_date', 'view_count')
+    autocomplete_fields = ('author', 'category')
+    readonly_fields = ('created_date', 'updated_date', 'view_count', 'bot_view_count')
     
     fieldsets = (
         ('Content', {
@@ -129,10 +253,11 @@ class VlogAdmin(admin.ModelAdmin):
             'fields': ('thumbnail',)
         }),
         ('Publishing', {
-            'fields': ('is_featured', 'is_published', 'published_date')
+            'fields': ('is_featured', 'is_published', 'published_date', 'is_scheduled'),
+            'description': 'Publishing with a future published date schedules the post; it goes live automatically at that time.'
         }),
         ('Metadata', {
-            'fields': ('created_date', 'updated_date', 'view_count'),
+            'fields': ('created_date', 'updated_date', 'view_count', 'bot_view_count'),
             'classes': ('collapse',)
         }),
     )
@@ -140,25 +265,25 @@ class VlogAdmin(admin.ModelAdmin):
     actions = ['make_published', 'make_unpublished', 'make_featured', 'make_unfeatured']
     
     def make_published(self, request, queryset):
-        """Mark selected vlogs as published"""
-        updated = queryset.update(is_published=True)
+        """Mark selected vlogs as published, effective now"""
+        updated = publish(queryset)
         self.message_user(request, f'{updated} vlogs were successfully marked as published.')
     make_published.short_description = "Mark selected vlogs as published"
     
     def make_unpublished(self, request, queryset):
         """Mark selected vlogs as unpublished"""
-        updated = queryset.update(is_published=False)
+        updated = unpublish(queryset)
         self.message_user(request, f'{updated} vlogs were successfully marked as unpublished.')
     make_unpublished.short_description = "Mark selected vlogs as unpublished"
     
     def make_featured(self, request, queryset):
         """Mark selected vlogs as featured"""
-        updated = queryset.update(is_featured=True)
+        updated = update_content(queryset, is_featured=True)
         self.message_user(request, f'{updated} vlogs were successfully marked as featured.')
     make_featured.short_description = "Mark selected vlogs as featured"
     
     def make_unfeatured(self, request, queryset):
         """Mark selected vlogs as unfeatured"""
-        updated = queryset.update(is_featured=False)
+        updated = update_content(queryset, is_featured=False)
         self.message_user(request, f'{updated} vlogs were successfully marked as unfeatured.')
     make_unfeatured.short_description = "Mark selected vlogs as unfeatured"
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""Aggregated view statistics for the admin.
+
+Every query is a grouped aggregate over a bounded date window on the
+(article, viewed_at) index, or a merge of one small HyperLogLog sketch per
+day, so the cost does not grow with an article's total number of hits.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArticleView
+from .tracking import unique_readers
+
+
+def _window_start(days):
+    today = timezone.localdate()
+    return today - timedelta(days=days - 1)
+
+
+def _window(article, days):
+    since = timezone.make_aware(datetime.combine(_window_start(days), time.min))
+    return ArticleView.objects.filter(article_id=article.pk, viewed_at__gte=since)
+
+
+def daily_views(article, days=30):
+    """Return ``[(date, views)]`` for the last ``days`` days, oldest first"""
+    counts = dict(
+        _window(article, days)
+        .annotate(day=TruncDate('viewed_at'))
+        .order_by()
+        .values('day')
+        .annotate(views=Count('id'))
+        .values_list('day', 'views')
+    )
+    start = _window_start(days)
+    return [(day, counts.get(day, 0)) for day in (start + timedelta(days=n) for n in range(days))]
+
+
+def unique_visitors(article, days=30):
+    """Estimate the distinct readers in the last ``days`` days from the daily sketches"""
+    return unique_readers([article.pk], _window_start(days), timezone.localdate())
+
+
+def top_referrers(article, days=30, limit=5):
+    """Return ``[(referrer, views)]`` for the most common referrers"""
+    return list(
+        _window(article, days)
+        .exclude(referrer='')
+        .order_by()
+        .values('referrer')
+        .annotate(views=Count('id'))
+        .order_by('-views')
+        .values_list('referrer', 'views')[:limit]
+    )
+
+
+def sparkline_points(values, width=240, height=40):
+    """Scale ``values`` to an SVG polyline ``points`` string"""
+    if not values:
+        return ''
+    peak = max(values) or 1
+    step = width / max(len(values) - 1, 1)
+    return ' '.join(
+        f'{index * step:.1f},{height - (value / peak) * height:.1f}'
+        for index, value in enumerate(values)
+    )
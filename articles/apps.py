@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ArticlesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'articles'
-    verbose_name = 'Articles'
\ No newline at end of file
+    verbose_name = 'Articles'
+
+    def ready(self):
+        from . import receivers  # noqa: F401
@@ -0,0 +1,139 @@
+"""Archive of raw ArticleView rows, one gzipped CSV file per day.
+
+``manage.py archive_views`` moves rows out of the ArticleView table into
+``<ARTICLE_VIEW_ARCHIVE_DIR>/<YYYY>/<MM>/<YYYY-MM-DD>.csv.gz`` (days in the
+site's time zone). Archiving a day again, e.g. for late rows, adds
+``<YYYY-MM-DD>.<n>.csv.gz`` next to it.
+
+This module only uses the standard library, so the archive can be read
+anywhere, without Django or the database::
+
+    python -m articles.archive /path/to/archive --from 2024-01-01 --to 2024-01-31 --article 12
+    python -m articles.archive /path/to/archive --from 2024-01-01 --count-by day
+"""
+import argparse
+import csv
+import gzip
+import os
+import re
+import sys
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+
+
+COLUMNS = ('id', 'article_id', 'viewed_at', 'ip_address', 'referrer', 'user_agent')
+FILE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.csv\.gz$')
+
+
+# Writing
+
+def day_path(root, day):
+    """A new file for ``day``: ``<day>.csv.gz``, or the next free ``<day>.<n>.csv.gz``"""
+    directory = Path(root) / f'{day:%Y}' / f'{day:%m}'
+    path = directory / f'{day.isoformat()}.csv.gz'
+    part = 1
+    while path.exists():
+        path = directory / f'{day.isoformat()}.{part}.csv.gz'
+        part += 1
+    return path
+
+
+class DayWriter:
+    """Write one day's rows to a temporary file, made final by ``commit``"""
+
+    def __init__(self, root, day):
+        self.day = day
+        self.path = day_path(root, day)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.temporary = self.path.with_name(self.path.name + '.tmp')
+        self.file = gzip.open(self.temporary, 'wt', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+        self.rows = 0
+        self.max_id = None
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.rows += 1
+        self.max_id = row[0] if self.max_id is None else max(self.max_id, row[0])
+
+    def close(self):
+        self.file.close()
+
+    def verify(self):
+        """Read the file back: it must decompress and hold every row written"""
+        return count_rows(self.temporary) == self.rows
+
+    def commit(self):
+        os.replace(self.temporary, self.path)
+
+    def discard(self):
+        self.close()
+        self.temporary.unlink(missing_ok=True)
+
+
+def count_rows(path):
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as file:
+        return sum(1 for _ in csv.reader(file)) - 1
+
+
+# Reading
+
+def files(root, start=None, end=None):
+    """The archive files of the days from ``start`` to ``end`` (inclusive), oldest first"""
+    found = []
+    for path in Path(root).glob('*/*/*.csv.gz'):
+        match = FILE_RE.match(path.name)
+        if match is None:
+            continue
+        day = date.fromisoformat(match[1])
+        if (start is None or day >= start) and (end is None or day <= end):
+            found.append((day, int(match[2] or 0), path))
+    return [path for day, part, path in sorted(found)]
+
+
+def read(root, start=None, end=None, article_ids=None):
+    """Yield the archived rows as dicts, with ``id``, ``article_id`` and ``viewed_at`` parsed"""
+    for path in files(root, start, end):
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as file:
+            for row in csv.DictReader(file):
+                row['article_id'] = int(row['article_id'])
+                if article_ids and row['article_id'] not in article_ids:
+                    continue
+                row['id'] = int(row['id'])
+                row['viewed_at'] = datetime.fromisoformat(row['viewed_at'])
+                yield row
+
+
+GROUPS = {
+    # viewed_at is stored in the site's time zone, like the file days
+    'day': lambda row: row['viewed_at'].date(),
+    'article': lambda row: row['article_id'],
+    'referrer': lambda row: row['referrer'],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the ArticleView archive.')
+    parser.add_argument('root', help='The archive directory (ARTICLE_VIEW_ARCHIVE_DIR)')
+    parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day, YYYY-MM-DD')
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day, YYYY-MM-DD')
+    parser.add_argument('--article', type=int, action='append', help='Only this article id (repeatable)')
+    parser.add_argument('--count-by', choices=sorted(GROUPS), help='Print counts instead of rows')
+    args = parser.parse_args(argv)
+
+    rows = read(args.root, args.start, args.end, set(args.article or ()))
+    writer = csv.writer(sys.stdout)
+    if args.count_by:
+        key = GROUPS[args.count_by]
+        counts = Counter(key(row) for row in rows)
+        writer.writerow((args.count_by, 'views'))
+        writer.writerows(sorted(counts.items(), key=lambda item: str(item[0])))
+    else:
+        writer.writerow(COLUMNS)
+        writer.writerows([row[column] for column in COLUMNS] for row in rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Cached building blocks of the public pages.
+
+Each helper reads one of the two-tier cache aliases from ``CACHES`` (``ads``,
+``home``, ``detail``); ``articles/receivers.py`` clears them when content
+changes. Cached lists hold model instances with their related objects already
+loaded (``cards()``), so templates can use them without further queries.
+"""
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import Advertisement, Article, Vlog
+
+
+def current_advertisements():
+    """Return the advertisements that are live right now"""
+    # Cache everything that hasn't ended yet and check the dates per request,
+    # so ads start and stop on time however long the entry is cached.
+    candidates = caches['ads'].get_or_set('candidates', lambda: list(
+        Advertisement.objects.filter(is_active=True, end_date__gte=timezone.now())
+        .order_by('-priority', '-created_date')
+    ))
+    return [ad for ad in candidates if ad.is_live()]
+
+
+def home_blocks():
+    """Return the featured articles and latest vlogs shown on the home page"""
+    return caches['home'].get_or_set('blocks', lambda: {
+        'featured_articles': list(
+            Article.objects.published().cards()
+            .filter(is_featured=True)
+            .order_by('-published_date')[:5]
+        ),
+        'latest_vlogs': list(
+            Vlog.objects.published().cards()
+            .order_by('-published_date')[:3]
+        ),
+    })
+
+
+def article_sidebar(article):
+    """Return the related and popular posts shown next to ``article``"""
+    return caches['detail'].get_or_set(f'sidebar:{article.pk}', lambda: {
+        'related_articles': list(article.get_related_articles()),
+        'popular_posts': list(
+            Article.objects.published().cards()
+            .filter(category_id=article.category_id)
+            .exclude(pk=article.pk)[:3]
+        ),
+    })
@@ -0,0 +1,71 @@
+"""A small HyperLogLog sketch for counting unique readers.
+
+A sketch estimates the number of distinct values added to it with a standard
+error of about 1.6% (``PRECISION = 12``, 4096 one-byte registers) no matter
+how many values were added. Sketches are merged by taking the register-wise
+maximum, so daily sketches can be combined into any date range or group of
+articles. ``to_bytes`` zlib-compresses the registers, which keeps sparse
+sketches (most articles on most days) down to a few hundred bytes.
+"""
+import hashlib
+import math
+import zlib
+
+from django.conf import settings
+
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+_VALUE_BITS = 64 - PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def _hash(value):
+    # Keyed, so the stored sketches cannot be tested against guessed IPs.
+    # Not SECRET_KEY: rotating it would count every reader twice.
+    key = settings.READER_SKETCH_KEY.encode()[:64]
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8, key=key).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """Mergeable cardinality estimator"""
+
+    __slots__ = ('registers',)
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+        if len(self.registers) != REGISTERS:
+            raise ValueError(f'Expected {REGISTERS} registers, got {len(self.registers)}')
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(zlib.decompress(data))
+
+    def to_bytes(self):
+        return zlib.compress(bytes(self.registers))
+
+    def add(self, value):
+        """Add ``value``; return True if the sketch changed"""
+        hashed = _hash(value)
+        index = hashed >> _VALUE_BITS
+        remainder = hashed & ((1 << _VALUE_BITS) - 1)
+        rank = _VALUE_BITS - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch (union of the counted sets)"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Return the estimated number of distinct values added"""
+        estimate = _ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * REGISTERS and zeros:
+            # Small-range correction (linear counting)
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return round(estimate)
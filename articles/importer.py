@@ -0,0 +1,237 @@
+"""Streaming bulk importer for articles and vlogs.
+
+Rows are read lazily from JSON Lines, CSV or Django fixture files, resolved
+against in-memory author/category lookup maps and written with
+``bulk_create`` in chunks, each chunk inside its own transaction. Derived
+data (search index, navigation counts, caches) is refreshed once at the end
+through the ``content_changed`` signal instead of once per row.
+"""
+import csv
+import json
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from authors.models import Author
+from categories.models import Category
+from .models import Article, Vlog
+from .publishing import normalize_publishing
+from .signals import content_changed
+from .slugs import SlugAllocator
+
+
+ARTICLE_FIELDS = (
+    'title', 'slug', 'excerpt', 'content', 'featured_image',
+    'is_featured', 'is_published', 'is_scheduled', 'published_date', 'view_count',
+)
+VLOG_FIELDS = (
+    'title', 'slug', 'description', 'video_url', 'thumbnail',
+    'is_featured', 'is_published', 'is_scheduled', 'published_date', 'view_count',
+)
+FIXTURE_MODELS = {
+    'articles.article': 'article',
+    'articles.vlog': 'vlog',
+}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+
+
+class ImportRowError(ValueError):
+    """Raised when a single row cannot be imported"""
+
+
+def read_jsonl(path):
+    """Yield one dict per non-empty line of a JSON Lines file"""
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_csv(path):
+    """Yield one dict per row of a CSV file with a header line"""
+    with open(path, encoding='utf-8', newline='') as handle:
+        yield from csv.DictReader(handle)
+
+
+def read_fixture(path):
+    """Yield the article and vlog objects of a Django JSON fixture
+
+    Their ``author`` and ``category`` are primary keys of the blog the fixture
+    came from, so they are replaced by the username and slug of the fixture's
+    own author and category objects; a key the fixture doesn't define can't
+    be matched and the row is skipped.
+    """
+    with open(path, encoding='utf-8') as handle:
+        objects = json.load(handle)
+    names = {'authors.author': {}, 'categories.category': {}}
+    for obj in objects:
+        model = obj.get('model', '').lower()
+        if model == 'authors.author':
+            names[model][obj.get('pk')] = obj['fields'].get('username')
+        elif model == 'categories.category':
+            names[model][obj.get('pk')] = obj['fields'].get('slug') or obj['fields'].get('name')
+    for obj in objects:
+        kind = FIXTURE_MODELS.get(obj.get('model', '').lower())
+        if kind:
+            row = dict(obj['fields'], type=kind)
+            for field, model in (('author', 'authors.author'), ('category', 'categories.category')):
+                if row.get(field) not in (None, ''):
+                    row[field] = names[model].get(row[field]) or f'fixture {field} #{row[field]}'
+            yield row
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+    'fixture': read_fixture,
+}
+
+
+def read_rows(path, fmt=None):
+    """Pick a reader from ``fmt`` or the file extension and return its rows"""
+    if fmt is None:
+        suffix = Path(path).suffix.lower()
+        fmt = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv', '.json': 'fixture'}.get(suffix)
+    if fmt not in READERS:
+        raise ValueError(f'Unsupported import format for {path!r}; use one of {", ".join(READERS)}.')
+    return READERS[fmt](path)
+
+
+class ContentImporter:
+    """Import article and vlog rows in chunks.
+
+    Each row is a dict with the model fields plus ``type`` (``article`` or
+    ``vlog``), ``author`` (username or id) and ``category`` (slug, name or id).
+    """
+
+    def __init__(self, chunk_size=500, create_categories=False, max_errors=100):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.max_errors = max_errors
+        self.counts = {'article': 0, 'vlog': 0, 'skipped': 0}
+        self.errors = []
+        self._authors = {}
+        self._categories = {}
+        self._slugs = {}
+        self._pending = {Article: [], Vlog: []}
+        self.now = timezone.now()
+
+    def load_lookups(self):
+        """Build the author and category lookup maps with one query each"""
+        for pk, username in Author.objects.values_list('pk', 'username'):
+            self._authors[str(pk)] = pk
+            self._authors[username.lower()] = pk
+        for pk, slug, name in Category.objects.values_list('pk', 'slug', 'name'):
+            self._categories[str(pk)] = pk
+            self._categories[slug.lower()] = pk
+            self._categories[name.lower()] = pk
+        self._slugs = {Article: SlugAllocator(Article), Vlog: SlugAllocator(Vlog)}
+
+    def run(self, rows):
+        """Import ``rows`` and return the per-type counts"""
+        self.load_lookups()
+        for line_number, row in enumerate(rows, start=1):
+            try:
+                obj = self.build(row)
+            except ImportRowError as exc:
+                self.counts['skipped'] += 1
+                if len(self.errors) < self.max_errors:
+                    self.errors.append(f'Row {line_number}: {exc}')
+                continue
+            pending = self._pending[type(obj)]
+            pending.append(obj)
+            if len(pending) >= self.chunk_size:
+                self.flush(type(obj))
+        for model in self._pending:
+            self.flush(model)
+        self.finish()
+        return self.counts
+
+    def build(self, row):
+        """Turn one row into an unsaved Article or Vlog instance"""
+        kind = (row.get('type') or 'article').strip().lower()
+        if kind == 'article':
+            model, fields = Article, ARTICLE_FIELDS
+        elif kind == 'vlog':
+            model, fields = Vlog, VLOG_FIELDS
+        else:
+            raise ImportRowError(f'unknown type {kind!r}')
+
+        title = (row.get('title') or '').strip()
+        if not title:
+            raise ImportRowError('missing title')
+
+        values = {}
+        for name in fields:
+            value = row.get(name)
+            if value in (None, ''):
+                continue
+            field = model._meta.get_field(name)
+            if field.get_internal_type() == 'BooleanField':
+                value = value if isinstance(value, bool) else str(value).strip().lower() in TRUE_VALUES
+            elif field.get_internal_type() == 'DateTimeField':
+                value = self.parse_date(value)
+            elif field.get_internal_type() == 'PositiveIntegerField':
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise ImportRowError(f'invalid {name} {value!r}') from None
+                if value < 0:
+                    raise ImportRowError(f'invalid {name} {value!r}')
+            values[name] = value
+        values['title'] = title
+        values['slug'] = self._slugs[model].allocate(values.get('slug') or title)
+        values['author_id'] = self.resolve_author(row.get('author'))
+        values['category_id'] = self.resolve_category(row.get('category'))
+        obj = model(**values)
+        normalize_publishing(obj, self.now)
+        return obj
+
+    def parse_date(self, value):
+        """Parse an ISO 8601 timestamp, assuming the site timezone if naive"""
+        parsed = parse_datetime(str(value))
+        if parsed is None:
+            raise ImportRowError(f'invalid date {value!r}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def resolve_author(self, value):
+        """Map a username or id to an author id"""
+        pk = self._authors.get(str(value).strip().lower()) if value not in (None, '') else None
+        if pk is None:
+            raise ImportRowError(f'unknown author {value!r}')
+        return pk
+
+    def resolve_category(self, value):
+        """Map a slug, name or id to a category id, creating it if allowed"""
+        if value in (None, ''):
+            raise ImportRowError('missing category')
+        key = str(value).strip().lower()
+        pk = self._categories.get(key)
+        if pk is None:
+            if not self.create_categories or key.isdigit():
+                raise ImportRowError(f'unknown category {value!r}')
+            category = Category.objects.create(name=str(value).strip())
+            pk = category.pk
+            self._categories[key] = self._categories[category.slug] = pk
+        return pk
+
+    def flush(self, model):
+        """Write the pending rows of ``model`` in one transaction"""
+        pending = self._pending[model]
+        if not pending:
+            return
+        with transaction.atomic():
+            model.objects.bulk_create(pending, batch_size=self.chunk_size)
+        self.counts[model._meta.model_name] += len(pending)
+        self._pending[model] = []
+
+    def finish(self):
+        """Refresh derived data once for everything that was imported"""
+        for model in (Article, Vlog):
+            if self.counts[model._meta.model_name]:
+                content_changed.send(sender=model, pks=None)
@@ -0,0 +1,108 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from articles import archive
+from articles.models import ArticleView
+
+
+def day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+class Command(BaseCommand):
+    help = 'Move ArticleView rows older than a cutoff to gzipped CSV files, one per day (see articles/archive.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=settings.ARTICLE_VIEW_ARCHIVE_AFTER_DAYS,
+            help=f'Archive the days before this many days ago (default: {settings.ARTICLE_VIEW_ARCHIVE_AFTER_DAYS})',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows deleted per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--keep-rows', action='store_true',
+            help='Write the archive files but leave the rows in the table',
+        )
+
+    def handle(self, *args, **options):
+        cutoff_day = timezone.localdate() - timedelta(days=options['older_than'])
+        oldest = ArticleView.objects.filter(viewed_at__lt=day_range(cutoff_day)[0]).aggregate(Min('viewed_at'))
+        if oldest['viewed_at__min'] is None:
+            self.stdout.write(f'No views before {cutoff_day}.')
+            return
+
+        # One day at a time, archived and deleted before the next: if the
+        # command stops, every day is either in the archive or in the table.
+        day = timezone.localtime(oldest['viewed_at__min']).date()
+        archived = deleted = days = 0
+        while day < cutoff_day:
+            writer = self.archive_day(day, options['chunk_size'])
+            if writer is not None:
+                if not options['keep_rows']:
+                    deleted += self.delete_day(writer, options['batch_size'])
+                archived += writer.rows
+                days += 1
+                self.stdout.write(f'{day}: {writer.rows} rows -> {writer.path}')
+            day += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} views from {days} days before {cutoff_day}, deleted {deleted}.'
+        ))
+
+    def archive_day(self, day, chunk_size):
+        start, end = day_range(day)
+        rows = (
+            ArticleView.objects.filter(viewed_at__gte=start, viewed_at__lt=end)
+            .order_by('viewed_at', 'pk')
+            .values_list(*archive.COLUMNS)
+            .iterator(chunk_size=chunk_size)
+        )
+        writer = None
+        try:
+            for row in rows:
+                if writer is None:
+                    writer = archive.DayWriter(settings.ARTICLE_VIEW_ARCHIVE_DIR, day)
+                writer.write((*row[:2], timezone.localtime(row[2]).isoformat(), *row[3:]))
+        except BaseException:
+            if writer is not None:
+                writer.discard()
+            raise
+        if writer is not None:
+            self.finish(writer)
+        return writer
+
+    def finish(self, writer):
+        """Close, verify and keep ``writer``'s file, or stop before its rows are deleted"""
+        writer.close()
+        start, end = day_range(writer.day)
+        in_table = ArticleView.objects.using(router.db_for_write(ArticleView)).filter(viewed_at__gte=start, viewed_at__lt=end, pk__lte=writer.max_id).count()
+        if not writer.verify() or in_table != writer.rows:
+            writer.discard()
+            raise CommandError(
+                f'{writer.day}: wrote {writer.rows} rows but the table has {in_table}; '
+                f'the rows of this day and later were left in the table.'
+            )
+        writer.commit()
+
+    def delete_day(self, writer, batch_size):
+        """Delete the archived rows of one day, ``batch_size`` at a time"""
+        start, end = day_range(writer.day)
+        using = router.db_for_write(ArticleView)
+        # Read the primary keys from the database deleting them, not a replica
+        archived = ArticleView.objects.using(using).filter(viewed_at__gte=start, viewed_at__lt=end, pk__lte=writer.max_id)
+        deleted = 0
+        while True:
+            with transaction.atomic(using=using):
+                pks = list(archived.order_by('pk').values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    return deleted
+                deleted += ArticleView.objects.using(using).filter(pk__in=pks).delete()[0]
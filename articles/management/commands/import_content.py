@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from articles.importer import READERS, ContentImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import articles and vlogs from JSON Lines, CSV or fixture files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to import')
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Input format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Rows written per bulk_create/transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--create-categories', action='store_true',
+            help='Create categories that do not exist yet instead of skipping the row',
+        )
+
+    def handle(self, *args, **options):
+        importer = ContentImporter(
+            chunk_size=options['chunk_size'],
+            create_categories=options['create_categories'],
+        )
+
+        def rows():
+            for path in options['paths']:
+                yield from read_rows(path, options['format'])
+
+        try:
+            counts = importer.run(rows())
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for error in importer.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['article']} articles and {counts['vlog']} vlogs "
+            f"({counts['skipped']} rows skipped)."
+        ))
@@ -0,0 +1,55 @@
+import os
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from articles import pdf
+from articles.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Render PDFs of the most viewed published articles ahead of time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=50,
+            help='Number of articles, most viewed first (default: 50)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Render processes (default: one per CPU)',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Render again even if the current PDF exists',
+        )
+
+    def handle(self, *args, **options):
+        if not pdf.available():
+            raise CommandError('WeasyPrint is not installed.')
+
+        articles = (
+            Article.objects.published()
+            .select_related('author', 'category')
+            .order_by('-view_count')[:options['top']]
+        )
+        skipped, failed = 0, 0
+        with pdf.make_executor(options['workers']) as executor:
+            futures = {}
+            for article in articles:
+                path = pdf.artifact_path(article)
+                if os.path.exists(path) and not options['force']:
+                    skipped += 1
+                    continue
+                futures[pdf.submit(article, path, executor)] = article
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{futures[future].slug}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {len(futures) - failed} PDFs ({skipped} up to date, {failed} failed).'
+        ))
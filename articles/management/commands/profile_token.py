@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a token that makes a request send back a profile (X-Profile-Token header)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write(
+            f'Valid for {settings.PROFILE_TOKEN_MAX_AGE // 60} minutes, e.g.\n'
+            f'  curl -sI -H "X-Profile-Token: <token>" https://example.com/ | grep X-Profile'
+        )
@@ -0,0 +1,81 @@
+import heapq
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from articles.models import Article, Vlog
+from articles.publishing import due, publish, publish_due
+
+
+class Command(BaseCommand):
+    help = 'Publish scheduled articles and vlogs whose published date has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running and publish each post as soon as it is due',
+        )
+        parser.add_argument(
+            '--refresh', type=float, default=60,
+            help='Seconds between reloads of the schedule in --loop mode (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.report(publish_due())
+            return
+
+        self.stdout.write('Scheduler running; press Ctrl+C to stop.')
+        try:
+            self.run_loop(options['refresh'])
+        except KeyboardInterrupt:
+            self.stdout.write('Scheduler stopped.')
+
+    def load_queue(self):
+        """Return a heap of ``(published_date, model_index, pk)`` for scheduled posts"""
+        queue = []
+        for index, model in enumerate(self.models):
+            queue.extend(
+                (published_date, index, pk)
+                for pk, published_date in model.objects.filter(is_scheduled=True).values_list('pk', 'published_date')
+            )
+        heapq.heapify(queue)
+        return queue
+
+    def run_loop(self, refresh):
+        self.models = (Article, Vlog)
+        while True:
+            close_old_connections()
+            # Catch up on anything that became due while the schedule was stale.
+            self.report(publish_due())
+            queue = self.load_queue()
+            reload_at = time.monotonic() + refresh
+
+            while time.monotonic() < reload_at:
+                if not queue:
+                    time.sleep(max(reload_at - time.monotonic(), 0))
+                    break
+                wait = (queue[0][0] - timezone.now()).total_seconds()
+                if wait > 0:
+                    time.sleep(min(wait, max(reload_at - time.monotonic(), 0)))
+                    continue
+
+                now = timezone.now()
+                batches = {}
+                while queue and queue[0][0] <= now:
+                    _published_date, index, pk = heapq.heappop(queue)
+                    batches.setdefault(index, []).append(pk)
+                counts = {}
+                for index, pks in batches.items():
+                    model = self.models[index]
+                    # Re-check in the database: the post may have been edited since.
+                    counts[model._meta.model_name] = publish(due(model, now).filter(pk__in=pks), now)
+                self.report(counts)
+
+    def report(self, counts):
+        published = {name: count for name, count in counts.items() if count}
+        if published:
+            summary = ', '.join(f'{count} {name}(s)' for name, count in published.items())
+            self.stdout.write(self.style.SUCCESS(f'{timezone.now():%Y-%m-%d %H:%M:%S} published {summary}'))
@@ -0,0 +1,52 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from django.utils import timezone
+
+from articles.hll import HyperLogLog
+from articles.models import ArticleReaderSketch, ArticleView
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily unique-reader sketches from stored ArticleView IP addresses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help='Rebuild this many days up to and including today (default: 30)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        first_day = timezone.localdate() - timedelta(days=options['days'] - 1)
+        since = timezone.make_aware(datetime.combine(first_day, time.min))
+        rows = (
+            ArticleView.objects.filter(viewed_at__gte=since, ip_address__isnull=False)
+            .order_by('viewed_at')
+            .values_list('article_id', 'ip_address', 'viewed_at')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        current_day, sketches, written = None, {}, 0
+        for article_id, ip_address, viewed_at in rows:
+            day = timezone.localtime(viewed_at).date()
+            if day != current_day:
+                written += self.save_day(current_day, sketches)
+                current_day, sketches = day, {}
+            sketches.setdefault(article_id, HyperLogLog()).add(ip_address)
+        written += self.save_day(current_day, sketches)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} daily reader sketches since {first_day}.'))
+
+    def save_day(self, day, sketches):
+        """Replace the stored sketches of ``day`` (one day's worth at a time)"""
+        if not sketches:
+            return 0
+        with transaction.atomic(using=router.db_for_write(ArticleReaderSketch)):
+            ArticleReaderSketch.objects.filter(day=day, article_id__in=list(sketches)).delete()
+            ArticleReaderSketch.objects.bulk_create(
+                ArticleReaderSketch(article_id=article_id, day=day, sketch=sketch.to_bytes())
+                for article_id, sketch in sketches.items()
+            )
+        return len(sketches)
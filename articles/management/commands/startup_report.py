@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+# Runs in a fresh interpreter so every import is really paid for.
+CHILD_CODE = """
+import json, time
+start = time.perf_counter()
+from blog.wsgi import application
+setup = time.perf_counter() - start
+from blog.warmup import warm_up
+steps = warm_up(connect={connect})
+print(json.dumps({{'setup': setup, 'steps': steps}}))
+"""
+
+
+def parse_importtime(stderr):
+    """Return ``[(module, self_us, cumulative_us)]`` from ``-X importtime`` output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Report import and warm-up costs of a cold worker start'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest modules to list')
+        parser.add_argument(
+            '--no-db', action='store_true',
+            help='Skip the database connection and page warm-up steps',
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_CODE.format(connect=not options['no_db'])],
+            cwd=PROJECT_ROOT, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else 'Startup failed')
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+
+        by_package = defaultdict(lambda: [0, 0])
+        for name, self_us, _cumulative in modules:
+            package = by_package[name.split('.')[0]]
+            package[0] += self_us
+            package[1] += 1
+
+        self.stdout.write(f"Django setup and WSGI application: {report['setup'] * 1000:.1f} ms")
+        self.stdout.write(f"Total import time: {sum(m[1] for m in modules) / 1000:.1f} ms in {len(modules)} modules")
+
+        self.stdout.write('\nImport time by top-level package (self time):')
+        ranked = sorted(by_package.items(), key=lambda item: item[1][0], reverse=True)
+        for package, (self_us, count) in ranked[:options['top']]:
+            self.stdout.write(f'  {package:<30} {self_us / 1000:8.1f} ms  ({count} modules)')
+
+        self.stdout.write('\nSlowest modules (cumulative time):')
+        for name, _self_us, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {name:<50} {cumulative_us / 1000:8.1f} ms')
+
+        self.stdout.write('\nWarm-up steps:')
+        for step, count, seconds in report['steps']:
+            self.stdout.write(f'  {step:<12} {seconds * 1000:8.1f} ms  ({count})')
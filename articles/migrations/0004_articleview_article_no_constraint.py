@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_advertisement_vlog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='articleview',
+            name='article',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='views', to='articles.article'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_articleview_article_no_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articleview',
+            name='referrer',
+            field=models.CharField(blank=True, help_text='HTTP referer of the visit', max_length=500),
+        ),
+        migrations.AddIndex(
+            model_name='articleview',
+            index=models.Index(fields=['article', 'viewed_at'], name='articleview_article_time_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0005_articleview_referrer_and_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='is_scheduled',
+            field=models.BooleanField(default=False, help_text='Publish automatically at the published date?'),
+        ),
+        migrations.AddField(
+            model_name='vlog',
+            name='is_scheduled',
+            field=models.BooleanField(default=False, help_text='Publish automatically at the published date?'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0006_scheduled_publishing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='articleview',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, help_text='Only kept when ARTICLE_VIEW_STORE_IP is on', null=True),
+        ),
+        migrations.CreateModel(
+            name='ArticleReaderSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sketch', models.BinaryField(help_text='Compressed HyperLogLog registers (see articles/hll.py)')),
+                ('article', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='reader_sketches', to='articles.article')),
+            ],
+            options={
+                'verbose_name_plural': 'Article Reader Sketches',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('article', 'day'), name='readersketch_article_day_unique')],
+            },
+        ),
+    ]
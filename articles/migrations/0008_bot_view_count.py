@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0007_article_reader_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='bot_view_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of views by crawlers and other bots'),
+        ),
+        migrations.AddField(
+            model_name='vlog',
+            name='bot_view_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of views by crawlers and other bots'),
+        ),
+    ]
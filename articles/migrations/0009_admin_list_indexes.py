@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0008_bot_view_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='articleview',
+            index=models.Index(fields=['viewed_at', 'id'], name='articleview_time_idx'),
+        ),
+    ]
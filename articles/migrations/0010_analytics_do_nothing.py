@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0009_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='articlereadersketch',
+            name='article',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reader_sketches', to='articles.article'),
+        ),
+        migrations.AlterField(
+            model_name='articleview',
+            name='article',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='views', to='articles.article'),
+        ),
+    ]
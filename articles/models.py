@@ -1,8 +1,40 @@
 from django.db import models
+from django.db.models.functions import Substr
 from django.urls import reverse
-from django.utils.text import slugify
 from authors.models import Author
 from categories.models import Category
+from .publishing import normalize_publishing
+from .slugs import unique_slug
+
+
+# Columns shown on list cards: never the article body or the full vlog
+# description. Author and category come in the same query.
+CARD_RELATED_FIELDS = ('author__first_name', 'author__last_name', 'category__name', 'category__slug')
+DESCRIPTION_PREVIEW_LENGTH = 300
+
+
+class ArticleQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(is_published=True)
+
+    def cards(self):
+        """Only what list cards display: no ``content``, author and category joined"""
+        return self.select_related('author', 'category').only(
+            'title', 'slug', 'excerpt', 'featured_image', 'published_date',
+            'author', 'category', *CARD_RELATED_FIELDS,
+        )
+
+
+class VlogQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(is_published=True)
+
+    def cards(self):
+        """Like ``ArticleQuerySet.cards``; the description is cut to ``description_preview``"""
+        return self.select_related('author', 'category').only(
+            'title', 'slug', 'thumbnail', 'published_date',
+            'author', 'category', *CARD_RELATED_FIELDS,
+        ).annotate(description_preview=Substr('description', 1, DESCRIPTION_PREVIEW_LENGTH))
 
 
 class Article(models.Model):
@@ -17,9 +49,13 @@ class Article(models.Model):
     is_featured = models.BooleanField(default=False, help_text="Is this a featured article?")
     is_published = models.BooleanField(default=False, help_text="Is this article published?")
     published_date = models.DateTimeField(blank=True, null=True, help_text="Date when published")
+    is_scheduled = models.BooleanField(default=False, help_text="Publish automatically at the published date?")
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
     view_count = models.PositiveIntegerField(default=0, help_text="Number of views")
+    bot_view_count = models.PositiveIntegerField(default=0, help_text="Number of views by crawlers and other bots")
+
+    objects = ArticleQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_date']
@@ -29,9 +65,12 @@ class Article(models.Model):
         return self.title
     
     def save(self, *args, **kwargs):
-        """Auto-generate slug from title if not provided"""
+        """Auto-generate slug from title if not provided and apply scheduling"""
         if not self.slug:
-            self.slug = slugify(self.title)
+            self.slug = unique_slug(type(self), self.title, exclude_pk=self.pk)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'is_published', 'is_scheduled', 'published_date'} & set(update_fields):
+            normalize_publishing(self)
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -40,9 +79,8 @@ class Article(models.Model):
     
     def get_related_articles(self, count=3):
         """Get related articles based on category and tags"""
-        return Article.objects.filter(
-            category=self.category,
-            is_published=True
+        return Article.objects.published().cards().filter(
+            category=self.category_id
         ).exclude(id=self.id)[:count]
         
     @property
@@ -52,17 +90,43 @@ class Article(models.Model):
 
 class ArticleView(models.Model):
     """Model to track article views"""
-    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='views')
-    ip_address = models.GenericIPAddressField()
+    # No database constraint, so the table can live in ANALYTICS_DATABASE.
+    # Rows of deleted articles are removed by articles/receivers.py on the
+    # right database; Django's CASCADE would delete on the article's one.
+    article = models.ForeignKey(Article, on_delete=models.DO_NOTHING, related_name='views', db_constraint=False)
+    ip_address = models.GenericIPAddressField(blank=True, null=True, help_text="Only kept when ARTICLE_VIEW_STORE_IP is on")
     user_agent = models.TextField(blank=True)
+    referrer = models.CharField(max_length=500, blank=True, help_text="HTTP referer of the visit")
     viewed_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-viewed_at']
         verbose_name_plural = "Article Views"
+        indexes = [
+            models.Index(fields=['article', 'viewed_at'], name='articleview_article_time_idx'),
+            # Date filters, date_hierarchy and the admin's (-viewed_at, -id) ordering
+            models.Index(fields=['viewed_at', 'id'], name='articleview_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.article.title} viewed from {self.ip_address or 'an unrecorded address'}"
+
+
+class ArticleReaderSketch(models.Model):
+    """HyperLogLog sketch of the distinct readers of an article on one day"""
+    article = models.ForeignKey(Article, on_delete=models.DO_NOTHING, related_name='reader_sketches', db_constraint=False)
+    day = models.DateField()
+    sketch = models.BinaryField(help_text="Compressed HyperLogLog registers (see articles/hll.py)")
+    
+    class Meta:
+        ordering = ['-day']
+        verbose_name_plural = "Article Reader Sketches"
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'day'], name='readersketch_article_day_unique'),
+        ]
     
     def __str__(self):
-        return f"{self.article.title} viewed from {self.ip_address}"
+        return f"Readers of {self.article_id} on {self.day}"
 
 
 class Advertisement(models.Model):
@@ -104,9 +168,13 @@ class Vlog(models.Model):
     is_featured = models.BooleanField(default=False, help_text="Is this a featured vlog?")
     is_published = models.BooleanField(default=False, help_text="Is this vlog published?")
     published_date = models.DateTimeField(blank=True, null=True, help_text="Date when published")
+    is_scheduled = models.BooleanField(default=False, help_text="Publish automatically at the published date?")
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
     view_count = models.PositiveIntegerField(default=0, help_text="Number of views")
+    bot_view_count = models.PositiveIntegerField(default=0, help_text="Number of views by crawlers and other bots")
+
+    objects = VlogQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_date']
@@ -116,9 +184,12 @@ class Vlog(models.Model):
         return self.title
     
     def save(self, *args, **kwargs):
-        """Auto-generate slug from title if not provided"""
+        """Auto-generate slug from title if not provided and apply scheduling"""
         if not self.slug:
-            self.slug = slugify(self.title)
+            self.slug = unique_slug(type(self), self.title, exclude_pk=self.pk)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'is_published', 'is_scheduled', 'published_date'} & set(update_fields):
+            normalize_publishing(self)
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -0,0 +1,108 @@
+"""PDF export of articles.
+
+Converting an article with WeasyPrint takes seconds, so it never happens in
+a request. The HTML is rendered in the web process (templates and database
+are there) and handed to a small process pool (``ARTICLE_PDF_WORKERS`` per
+web worker, started on first use), which writes the PDF under
+``MEDIA_ROOT/ARTICLE_PDF_DIR``. Until the file exists, readers get a
+"202 Accepted" page that retries.
+
+Artifacts are named ``<id>-<updated_date>.pdf``: editing an article changes
+the name, so an outdated PDF is never served, and older versions are removed
+once the new one is written. A cache key keeps two web workers from rendering
+the same version at the same time.
+"""
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .models import Article
+from .pdfworker import write_pdf
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}   # artifact path -> Future, renders started by this process
+
+
+@lru_cache(maxsize=None)
+def available():
+    """Return True if WeasyPrint is installed"""
+    return importlib.util.find_spec('weasyprint') is not None
+
+
+def make_executor(workers):
+    # spawn: the render processes must not inherit the web worker's database
+    # connections and threads.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor(settings.ARTICLE_PDF_WORKERS)
+        return _executor
+
+
+def artifact_path(article):
+    version = int(article.updated_date.timestamp() * 1_000_000)
+    return os.path.join(settings.MEDIA_ROOT, settings.ARTICLE_PDF_DIR, f'{article.pk}-{version}.pdf')
+
+
+def _lock_key(path):
+    return f'pdf:rendering:{os.path.basename(path)}'
+
+
+def render_html(article):
+    image_uri = None
+    if article.featured_image and os.path.exists(article.featured_image.path):
+        # A file URI, so WeasyPrint reads the image from disk instead of over HTTP
+        image_uri = Path(article.featured_image.path).as_uri()
+    return render_to_string('articles/article_pdf.html', {'article': article, 'image_uri': image_uri})
+
+
+def submit(article, path, executor=None):
+    """Start rendering ``article`` to ``path``; return the Future"""
+    html = render_html(article)
+    base_url = Path(settings.MEDIA_ROOT).as_uri() + '/'
+    future = (executor or _get_executor()).submit(write_pdf, html, base_url, path)
+    _pending[path] = future
+    future.add_done_callback(partial(_finished, path))
+    return future
+
+
+def _finished(path, future):
+    _pending.pop(path, None)
+    if future.exception() is None:
+        cache.delete(_lock_key(path))
+    else:
+        # Keep the lock until it expires, so a failing article isn't retried
+        # on every request.
+        logger.error('Rendering %s failed', path, exc_info=future.exception())
+
+
+def ensure_pdf(article):
+    """Return the PDF path of ``article`` if it exists, else start rendering it and return None
+
+    ``article`` may be loaded with only ``id`` and ``updated_date``.
+    """
+    path = artifact_path(article)
+    if os.path.exists(path):
+        return path
+    if path in _pending:
+        return None
+    if cache.add(_lock_key(path), os.getpid(), settings.ARTICLE_PDF_TIMEOUT):
+        submit(Article.objects.select_related('author', 'category').get(pk=article.pk), path)
+    return None
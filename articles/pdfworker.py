@@ -0,0 +1,28 @@
+"""Runs in the PDF render processes (see ``articles/pdf.py``).
+
+Deliberately free of Django imports: the pool starts processes with
+``spawn``, and all they need is WeasyPrint and the already rendered HTML.
+"""
+import glob
+import os
+
+
+def write_pdf(html, base_url, target):
+    """Render ``html`` to ``target`` atomically and remove older versions"""
+    from weasyprint import HTML
+
+    directory, name = os.path.split(target)
+    os.makedirs(directory, exist_ok=True)
+    temporary = f'{target}.{os.getpid()}.tmp'
+    HTML(string=html, base_url=base_url).write_pdf(temporary)
+    os.replace(temporary, target)
+
+    # Artifacts of earlier versions of the same article: "<id>-<timestamp>.pdf"
+    article_id = name.split('-', 1)[0]
+    for stale in glob.glob(os.path.join(directory, f'{article_id}-*.pdf')):
+        if stale != target:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return target
@@ -0,0 +1,71 @@
+"""Publishing transitions for articles and vlogs.
+
+``is_published`` is the only flag request-time queries look at. A post with a
+future ``published_date`` is stored as scheduled (``is_scheduled=True``,
+``is_published=False``) and flipped by ``publish_due`` once that date has
+passed, so list views never need a ``published_date <= now()`` filter.
+
+Every transition goes through ``update_content``, which sends
+``content_changed`` so caches, search suggestions and counters are refreshed
+the same way for the admin actions and the scheduler.
+"""
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .signals import content_changed
+
+
+def normalize_publishing(obj, now=None):
+    """Apply the scheduling rules to an unsaved Article or Vlog instance"""
+    now = now or timezone.now()
+    if obj.is_published and obj.published_date and obj.published_date > now:
+        obj.is_published, obj.is_scheduled = False, True
+    elif obj.is_scheduled and (obj.published_date is None or obj.published_date <= now):
+        obj.is_published, obj.is_scheduled = obj.published_date is not None, False
+    if obj.is_published:
+        obj.is_scheduled = False
+        if obj.published_date is None:
+            obj.published_date = now
+
+
+def update_content(queryset, **fields):
+    """Update ``queryset`` in bulk and announce the change once"""
+    model = queryset.model
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return 0
+    updated = model.objects.filter(pk__in=pks).update(**fields)
+    content_changed.send(sender=model, pks=pks)
+    return updated
+
+
+def publish(queryset, now=None):
+    """Publish ``queryset`` now; posts without a past published_date get ``now``"""
+    now = now or timezone.now()
+    return update_content(
+        queryset,
+        is_published=True,
+        is_scheduled=False,
+        published_date=Case(
+            When(Q(published_date__isnull=True) | Q(published_date__gt=now), then=Value(now)),
+            default=F('published_date'),
+        ),
+    )
+
+
+def unpublish(queryset):
+    """Take ``queryset`` offline and cancel any pending schedule"""
+    return update_content(queryset, is_published=False, is_scheduled=False)
+
+
+def due(model, now=None):
+    """Return the scheduled posts of ``model`` whose time has come"""
+    return model.objects.filter(is_scheduled=True, published_date__lte=now or timezone.now())
+
+
+def publish_due(now=None):
+    """Publish every scheduled article and vlog that is due; return the counts"""
+    from .models import Article, Vlog
+
+    now = now or timezone.now()
+    return {model._meta.model_name: publish(due(model, now), now) for model in (Article, Vlog)}
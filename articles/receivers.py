@@ -0,0 +1,155 @@
+"""Keep derived data in step with content changes.
+
+Clears the page caches (``articles/caching.py``), updates the search
+suggestion index (``articles/suggest.py``) and purges the affected pages from
+the CDN (``blog/surrogate.py``).
+"""
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from authors.models import Author
+from blog import surrogate
+from categories.models import Category
+from comments.models import Comment
+
+from . import suggest
+from .models import Advertisement, Article, ArticleReaderSketch, ArticleView, Vlog
+from .signals import content_changed
+
+
+@receiver(post_save, sender=Advertisement)
+@receiver(post_delete, sender=Advertisement)
+def advertisement_changed(sender, **kwargs):
+    caches['ads'].clear()
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Vlog)
+@receiver(post_delete, sender=Vlog)
+@receiver(content_changed)
+def content_updated(sender, **kwargs):
+    # view_count updates go through queryset.update() and don't get here.
+    caches['home'].clear()
+    if sender is not Vlog:
+        caches['detail'].clear()
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Vlog)
+@receiver(post_delete, sender=Vlog)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def reindex_suggestions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and update_fields <= {'last_login', 'view_count'}:
+        return
+    suggest.record_change(sender, [instance.pk])
+
+
+@receiver(content_changed)
+def reindex_suggestions_in_bulk(sender, pks=None, **kwargs):
+    suggest.record_change(sender, pks)
+
+
+# Fields that decide which lists an article or vlog appears in, and where
+LISTING_FIELDS = ('is_published', 'is_featured', 'published_date', 'category_id', 'author_id')
+# Fields behind the published article counts of the category menu
+COUNTED_FIELDS = ('is_published', 'category_id')
+
+
+@receiver(pre_save, sender=Article)
+@receiver(pre_save, sender=Vlog)
+def remember_listing(sender, instance, **kwargs):
+    instance._listing_before = None
+    if instance.pk is not None:
+        instance._listing_before = sender.objects.filter(pk=instance.pk).values(*LISTING_FIELDS).first()
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Vlog)
+@receiver(post_delete, sender=Vlog)
+def purge_content(sender, instance, signal, created=False, **kwargs):
+    keys = surrogate.keys_for(sender, [instance.pk])
+    before = getattr(instance, '_listing_before', None)
+    after = {field: getattr(instance, field) for field in LISTING_FIELDS}
+    # An edit only changes the post's own page and its cards (tagged with its
+    # key); list pages are purged when the post enters, leaves or moves in them.
+    if created or signal is post_delete or before != after:
+        keys.append(surrogate.list_key(sender))
+    # Every page shows the category menu's counts
+    if sender is Article and (
+        created or signal is post_delete
+        or before is None or any(before[field] != after[field] for field in COUNTED_FIELDS)
+    ):
+        keys.append(surrogate.list_key(Category))
+    surrogate.purge(*keys)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def purge_object(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and update_fields <= {'last_login'}:
+        return
+    surrogate.purge(*surrogate.keys_for(sender, [instance.pk]), surrogate.list_key(sender))
+
+
+@receiver(post_save, sender=Advertisement)
+@receiver(post_delete, sender=Advertisement)
+def purge_advertisements(sender, **kwargs):
+    surrogate.purge(surrogate.list_key(sender))
+
+
+@receiver(pre_save, sender=Comment)
+def remember_approval(sender, instance, **kwargs):
+    instance._was_approved = False
+    if instance.pk is not None:
+        instance._was_approved = sender.objects.filter(pk=instance.pk, is_approved=True).exists()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_commented_article(sender, instance, signal, **kwargs):
+    # Only approved comments are shown: new ones awaiting moderation don't
+    # change the page, approving or removing a shown one does.
+    if signal is post_delete:
+        changed = instance.is_approved
+    else:
+        changed = instance.is_approved or getattr(instance, '_was_approved', False)
+    if changed:
+        surrogate.purge(*surrogate.keys_for(Article, [instance.article_id]))
+
+
+@receiver(content_changed)
+def purge_in_bulk(sender, pks=None, **kwargs):
+    if pks is None:
+        surrogate.purge(surrogate.SITE_KEY)
+    else:
+        keys = [*surrogate.keys_for(sender, pks), surrogate.list_key(sender)]
+        if sender is Article:
+            # Publishing and unpublishing change the category menu's counts
+            keys.append(surrogate.list_key(Category))
+        surrogate.purge(*keys)
+
+
+@receiver(post_delete, sender=Article)
+def delete_analytics(sender, instance, using, **kwargs):
+    """Remove the views and reader sketches of a deleted article
+
+    Their foreign keys have no database constraint and DO_NOTHING, because
+    the rows may live in ANALYTICS_DATABASE.
+    """
+    # Django clears instance.pk once the deletion is done
+    article_id = instance.pk
+
+    def delete():
+        for model in (ArticleView, ArticleReaderSketch):
+            model.objects.using(router.db_for_write(model)).filter(article_id=article_id).delete()
+    transaction.on_commit(delete, using=using)
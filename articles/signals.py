@@ -0,0 +1,13 @@
+"""Signals sent by the articles app.
+
+Bulk operations such as ``bulk_create`` and ``QuerySet.update`` bypass the
+``post_save``/``post_delete`` model signals, so code that changes content in
+bulk sends ``content_changed`` once at the end instead of once per row.
+"""
+from django.dispatch import Signal
+
+
+# Sent with ``sender`` set to the model class (Article or Vlog) and ``pks``
+# set to the list of affected primary keys, or ``None`` when too many rows
+# changed to list them individually (e.g. after a bulk import).
+content_changed = Signal()
@@ -0,0 +1,46 @@
+from django.utils.text import slugify
+
+
+def _next_free(base, taken, max_length):
+    """Return ``base`` or the first ``base-N`` variant not in ``taken``"""
+    if base not in taken:
+        return base
+    counter = 2
+    while True:
+        suffix = f'-{counter}'
+        candidate = f'{base[:max_length - len(suffix)]}{suffix}'
+        if candidate not in taken:
+            return candidate
+        counter += 1
+
+
+def unique_slug(model, value, exclude_pk=None):
+    """Generate a slug for ``value`` that is not yet used by ``model``"""
+    max_length = model._meta.get_field('slug').max_length
+    base = slugify(value)[:max_length] or model._meta.model_name
+    existing = model._default_manager.filter(slug__startswith=base[:max_length - 4])
+    if exclude_pk is not None:
+        existing = existing.exclude(pk=exclude_pk)
+    return _next_free(base, set(existing.values_list('slug', flat=True)), max_length)
+
+
+class SlugAllocator:
+    """Hand out unique slugs for many new rows of one model.
+
+    The existing slugs are loaded once, so allocating slugs for a whole import
+    costs a single query instead of one lookup per row.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.max_length = model._meta.get_field('slug').max_length
+        self.taken = set(
+            model._default_manager.values_list('slug', flat=True).iterator(chunk_size=5000)
+        )
+
+    def allocate(self, value):
+        """Reserve and return a unique slug for ``value``"""
+        base = slugify(value)[:self.max_length] or self.model._meta.model_name
+        slug = _next_free(base, self.taken, self.max_length)
+        self.taken.add(slug)
+        return slug
@@ -0,0 +1,282 @@
+"""In-memory search suggestions (search-as-you-type).
+
+Every worker keeps a ``SuggestionIndex`` over published article and vlog
+titles, active category names and author names. Words are stored in a sorted
+array, so the word being typed is a ``bisect`` range scan. When that finds
+too little, words sharing enough trigrams with it are used as well, which
+tolerates typos ("nairbi" finds "Nairobi"). A lookup touches neither the
+database nor the cache.
+
+Changes are applied incrementally (``record_change``, called from
+``articles/receivers.py``): the object is re-read and its entry replaced in
+this worker's index, and the change is appended to a short journal in the
+shared cache. Other workers replay the journal at most every
+``SUGGEST_CHECK_INTERVAL`` seconds, and rebuild from scratch if they fell
+too far behind.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+
+VERSION_KEY = 'suggest:version'
+CHANGE_KEY = 'suggest:change:{}'
+JOURNAL_LENGTH = 200
+
+# Fuzzy matches must share this fraction of their trigrams with the query word
+MIN_SIMILARITY = 0.35
+# Bound on the prefix scan for very short prefixes ("a" matches a lot). Exact
+# words sort before longer ones, so without further query words a few times
+# ``limit`` candidates are enough.
+MAX_SCAN = 500
+SCAN_PER_RESULT = 4
+# Fuzzy candidates are at most this many characters shorter or longer than the
+# typed word (it is usually an unfinished prefix, so allow longer ones more).
+FUZZY_SHORTER, FUZZY_LONGER = 2, 3
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def words(text):
+    """Lowercase, accent-free words of ``text``"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _WORD_RE.findall(text.lower())
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _author_name(author):
+    return author.get_full_name() or author.username
+
+
+# kind -> (model label, rows to index, label of a row, fields the label and
+# URL need). The order is also the ranking of equally good matches.
+SOURCES = {
+    'category': ('categories.category', Q(is_active=True), lambda obj: obj.name, ('name', 'slug')),
+    'article': ('articles.article', Q(is_published=True), lambda obj: obj.title, ('title', 'slug')),
+    'vlog': ('articles.vlog', Q(is_published=True), lambda obj: obj.title, ('title', 'slug')),
+    'author': ('authors.author', Q(is_active=True), _author_name, ('first_name', 'last_name', 'username')),
+}
+KIND_ORDER = {kind: order for order, kind in enumerate(SOURCES)}
+KINDS_BY_MODEL = {label: kind for kind, (label, *_rest) in SOURCES.items()}
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}                   # (kind, pk) -> (label, url, words)
+        self.keys = []                      # sorted [(word, kind, pk)]
+        self.postings = defaultdict(set)    # word -> {(kind, pk)}
+        self.trigrams = defaultdict(lambda: defaultdict(set))  # trigram -> length -> {word}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, kind, pk, label, url):
+        with self.lock:
+            self._remove((kind, pk))
+            for key in self._add((kind, pk), label, url):
+                insort(self.keys, key)
+
+    def add_many(self, rows):
+        """Add ``(kind, pk, label, url)`` rows to an empty index, sorting once"""
+        with self.lock:
+            for kind, pk, label, url in rows:
+                self.keys.extend(self._add((kind, pk), label, url))
+            self.keys.sort()
+
+    def replace(self, kind, rows):
+        """Replace every entry of ``kind`` with ``(kind, pk, label, url)`` rows, sorting once"""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == kind]:
+                self._forget(key)
+            self.keys = [key for key in self.keys if key[1] != kind]
+            for _kind, pk, label, url in rows:
+                self.keys.extend(self._add((kind, pk), label, url))
+            self.keys.sort()
+
+    def _add(self, key, label, url):
+        entry_words = tuple(dict.fromkeys(words(label)))
+        self.entries[key] = (label, url, entry_words)
+        for word in entry_words:
+            if not self.postings[word]:
+                for trigram in trigrams(word):
+                    self.trigrams[trigram][len(word)].add(word)
+            self.postings[word].add(key)
+        return [(word, *key) for word in entry_words]
+
+    def remove(self, kind, pk):
+        with self.lock:
+            self._remove((kind, pk))
+
+    def _remove(self, key):
+        for word in self._forget(key):
+            index = bisect_left(self.keys, (word, *key))
+            if index < len(self.keys) and self.keys[index] == (word, *key):
+                del self.keys[index]
+
+    def _forget(self, key):
+        """Drop ``key``'s entry and postings (not its sorted keys); return its words"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return ()
+        for word in entry[2]:
+            postings = self.postings[word]
+            postings.discard(key)
+            if not postings:
+                del self.postings[word]
+                for trigram in trigrams(word):
+                    self.trigrams[trigram][len(word)].discard(word)
+        return entry[2]
+
+    def search(self, query, limit=8):
+        """Return up to ``limit`` ``{'kind', 'label', 'url'}`` dicts for ``query``"""
+        terms = words(query)
+        if not terms:
+            return []
+        *head, last = terms
+        scores = {}
+        scan = MAX_SCAN if head else limit * SCAN_PER_RESULT
+        with self.lock:
+            start = bisect_left(self.keys, (last,))
+            for word, kind, pk in self.keys[start:start + scan]:
+                if not word.startswith(last):
+                    break
+                score = 1.0 if word == last else 0.9
+                scores[(kind, pk)] = max(scores.get((kind, pk), 0), score)
+
+            if len(scores) < limit and len(last) >= 3:
+                for word, similarity in self._similar_words(last):
+                    for key in self.postings[word]:
+                        scores.setdefault(key, 0.8 * similarity)
+
+            results = []
+            for key, score in scores.items():
+                label, url, entry_words = self.entries[key]
+                # Earlier words of the query must all appear (as prefixes)
+                if all(any(word.startswith(term) for word in entry_words) for term in head):
+                    results.append((-score, KIND_ORDER[key[0]], len(label), label, url, key[0]))
+        results.sort()
+        return [
+            {'kind': kind, 'label': label, 'url': url}
+            for _score, _order, _length, label, url, kind in results[:limit]
+        ]
+
+    def _similar_words(self, word):
+        wanted = trigrams(word)
+        lengths = range(max(1, len(word) - FUZZY_SHORTER), len(word) + FUZZY_LONGER + 1)
+        shared = Counter()
+        for trigram in wanted:
+            by_length = self.trigrams.get(trigram)
+            if by_length:
+                for length in lengths:
+                    shared.update(by_length.get(length, ()))
+        for candidate, count in shared.items():
+            # A padded word has len + 1 trigrams (fewer only if some repeat)
+            similarity = count / (len(wanted) + len(candidate) + 1 - count)
+            if similarity >= MIN_SIMILARITY:
+                yield candidate, similarity
+
+
+def _rows(kind, pks=None):
+    label, condition, _label, fields = SOURCES[kind]
+    # Not the article bodies or the authors' password hashes
+    queryset = apps.get_model(label)._default_manager.filter(condition).only(*fields)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return queryset.iterator(chunk_size=2000)
+
+
+def _source_rows(kind, pks=None):
+    get_label = SOURCES[kind][2]
+    for obj in _rows(kind, pks):
+        yield kind, obj.pk, get_label(obj), obj.get_absolute_url()
+
+
+def _load(index, kind, pks=None):
+    """(Re)index the rows of ``kind`` (all of them when ``pks`` is None)"""
+    if pks is None:
+        # Row by row, each insertion into the sorted keys costs O(n)
+        index.replace(kind, list(_source_rows(kind)))
+        return
+    found = set()
+    for _kind, pk, label, url in _source_rows(kind, pks):
+        index.add(kind, pk, label, url)
+        found.add(pk)
+    for pk in set(pks) - found:
+        # Deleted, unpublished or deactivated
+        index.remove(kind, pk)
+
+
+def build_index():
+    index = SuggestionIndex()
+    index.add_many(row for kind in SOURCES for row in _source_rows(kind))
+    return index
+
+
+_state = {'index': None, 'version': None, 'checked': 0.0}
+_state_lock = threading.Lock()
+
+
+def _sync():
+    version = cache.get(VERSION_KEY, 0)
+    with _state_lock:
+        index, local = _state['index'], _state['version']
+        if index is None or version < local or version - local > JOURNAL_LENGTH:
+            index = build_index()
+        elif version > local:
+            changes = cache.get_many([CHANGE_KEY.format(n) for n in range(local + 1, version + 1)])
+            if len(changes) != version - local:
+                # Part of the journal expired or is still being written
+                index = build_index()
+            else:
+                for n in range(local + 1, version + 1):
+                    kind, pks = changes[CHANGE_KEY.format(n)]
+                    _load(index, kind, pks)
+        _state.update(index=index, version=version, checked=time.monotonic())
+        return index
+
+
+def get_index():
+    """Return this worker's index, catching up with other workers' changes"""
+    if _state['index'] is None or time.monotonic() - _state['checked'] >= settings.SUGGEST_CHECK_INTERVAL:
+        return _sync()
+    return _state['index']
+
+
+def record_change(model, pks=None):
+    """Reindex ``pks`` of ``model`` (all rows if None) here and in every other worker"""
+    kind = KINDS_BY_MODEL.get(model._meta.label_lower)
+    if kind is None:
+        return
+    pks = None if pks is None else list(pks)
+    # Atomic on Redis; on the file cache two simultaneous changes can share a
+    # number, and the other workers then only pick one up at their next rebuild.
+    cache.add(VERSION_KEY, 0, None)
+    version = cache.incr(VERSION_KEY)
+    cache.touch(VERSION_KEY, None)
+    cache.set(CHANGE_KEY.format(version), (kind, pks), 24 * 60 * 60)
+
+    with _state_lock:
+        index = _state['index']
+        if index is None:
+            return
+        _load(index, kind, pks)
+        if _state['version'] == version - 1:
+            _state['version'] = version
+
+
+def suggest(query, limit=8):
+    return get_index().search(query, limit)
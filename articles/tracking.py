@@ -0,0 +1,191 @@
+"""Recording of article and vlog views.
+
+Each view increments ``Article.view_count``, stores an ``ArticleView`` row and
+adds the reader to that day's HyperLogLog sketch, which is what unique reader
+counts are computed from. Views from bots (see ``bots.is_bot``) skip all of
+that and are only tallied in ``bot_view_count`` (``BOT_VIEW_POLICY``).
+
+Readers are added to sketches held in the worker's memory, one per article
+and day, and merged into the stored sketches at most every
+``TRACKING_FLUSH_INTERVAL`` seconds and when the process exits, so views
+don't queue on the row lock of a popular article's sketch. Bot views are
+tallied the same way and written with one UPDATE per post and flush.
+"""
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from blog.ratelimit import allow, client_address
+
+from .bots import is_bot
+from .hll import HyperLogLog
+from .models import Article, ArticleReaderSketch, ArticleView, Vlog
+
+
+def _count_bot(obj):
+    if settings.BOT_VIEW_POLICY == 'count':
+        with _lock:
+            _bot_views[type(obj), obj.pk] += 1
+        _flush_if_due()
+
+
+def record_view(request, article):
+    """Record one view of ``article``; return False if it came from a bot"""
+    user_agent = request.META.get('HTTP_USER_AGENT', '')
+    if is_bot(user_agent):
+        _count_bot(article)
+        return False
+
+    ip_address = client_address(request)
+    Article.objects.filter(pk=article.pk).update(view_count=F('view_count') + 1)
+    article.view_count += 1
+
+    ArticleView.objects.create(
+        article=article,
+        ip_address=ip_address if settings.ARTICLE_VIEW_STORE_IP else None,
+        user_agent=user_agent,
+        referrer=request.META.get('HTTP_REFERER', '')[:500],
+    )
+    if ip_address:
+        record_reader(article.pk, ip_address)
+    return True
+
+
+def record_vlog_view(request, vlog):
+    """Count one view of ``vlog``; return False if it came from a bot"""
+    if is_bot(request.META.get('HTTP_USER_AGENT', '')):
+        _count_bot(vlog)
+        return False
+    Vlog.objects.filter(pk=vlog.pk).update(view_count=F('view_count') + 1)
+    vlog.view_count += 1
+    return True
+
+
+def track_article_view(request, article_id):
+    """Record a view of a cached article page (replayed by blog/pagecache.py)"""
+    if allow(request, 'view'):
+        record_view(request, Article(pk=article_id))
+
+
+def track_vlog_view(request, vlog_id):
+    """Record a view of a cached vlog page (replayed by blog/pagecache.py)"""
+    if allow(request, 'view'):
+        record_vlog_view(request, Vlog(pk=vlog_id))
+
+
+# Unsaved reader sketches of this process, by (article id, day), and bot
+# views, by (model, pk)
+_readers = {}
+_bot_views = Counter()
+_lock = threading.Lock()
+_flushed = {'at': time.monotonic()}
+
+
+def record_reader(article_id, visitor, day=None):
+    """Add ``visitor`` to the reader sketch of ``article_id`` for ``day``"""
+    day = day or timezone.localdate()
+    with _lock:
+        _readers.setdefault((article_id, day), HyperLogLog()).add(visitor)
+    _flush_if_due()
+
+
+def _flush_if_due():
+    with _lock:
+        due = time.monotonic() - _flushed['at'] >= settings.TRACKING_FLUSH_INTERVAL
+        if due:
+            _flushed['at'] = time.monotonic()
+    if due:
+        flush()
+
+
+def flush():
+    """Write the buffered bot views and reader sketches to the database"""
+    with _lock:
+        pending = dict(_readers)
+        _readers.clear()
+        bot_views = _bot_views.copy()
+        _bot_views.clear()
+        _flushed['at'] = time.monotonic()
+    try:
+        _save_bot_views(bot_views)
+        while pending:
+            (article_id, day), sketch = next(iter(pending.items()))
+            _save_sketch(article_id, day, sketch)
+            del pending[(article_id, day)]
+    except Exception:
+        # Keep what wasn't saved for the next flush
+        with _lock:
+            _bot_views.update(bot_views)
+            for key, unsaved in pending.items():
+                _readers.setdefault(key, HyperLogLog()).merge(unsaved)
+        raise
+
+
+atexit.register(flush)
+
+
+def _save_bot_views(bot_views):
+    # Posts with the same number of views share an UPDATE
+    by_count = defaultdict(list)
+    for (model, pk), count in bot_views.items():
+        by_count[model, count].append(pk)
+    for (model, count), pks in by_count.items():
+        model.objects.filter(pk__in=pks).update(bot_view_count=F('bot_view_count') + count)
+        for pk in pks:
+            del bot_views[model, pk]
+
+
+def _save_sketch(article_id, day, sketch):
+    using = router.db_for_write(ArticleReaderSketch)
+    with transaction.atomic(using=using):
+        row = (
+            ArticleReaderSketch.objects.using(using)
+            .select_for_update()
+            .filter(article_id=article_id, day=day)
+            .first()
+        )
+        if row is None:
+            try:
+                with transaction.atomic(using=using):
+                    ArticleReaderSketch.objects.using(using).create(
+                        article_id=article_id, day=day, sketch=sketch.to_bytes()
+                    )
+                return
+            except IntegrityError:
+                # Another worker created the row first; update theirs.
+                row = ArticleReaderSketch.objects.using(using).select_for_update().get(
+                    article_id=article_id, day=day
+                )
+        stored = HyperLogLog.from_bytes(row.sketch)
+        merged = HyperLogLog(stored.registers).merge(sketch)
+        if merged.registers != stored.registers:
+            row.sketch = merged.to_bytes()
+            row.save(update_fields=['sketch'])
+
+
+def merged_sketch(article_ids, start, end):
+    """Merge the daily sketches of ``article_ids`` between two dates (inclusive)"""
+    merged = HyperLogLog()
+    sketches = ArticleReaderSketch.objects.filter(
+        article_id__in=article_ids, day__gte=start, day__lte=end
+    ).values_list('sketch', flat=True)
+    for data in sketches.iterator():
+        merged.merge(HyperLogLog.from_bytes(data))
+    return merged
+
+
+def unique_readers(article_ids, start, end):
+    """Estimate the distinct readers of ``article_ids`` between two dates"""
+    return merged_sketch(article_ids, start, end).count()
+
+
+def category_unique_readers(category, start, end):
+    """Estimate the distinct readers of all articles in ``category``"""
+    article_ids = list(Article.objects.filter(category=category).values_list('pk', flat=True))
+    return unique_readers(article_ids, start, end)
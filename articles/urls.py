@@ -6,7 +6,9 @@ app_name = 'articles'
 urlpatterns = [
     path('', views.home, name='home'),
     path('article/<slug:slug>/', views.article_detail, name='article_detail'),
+    path('article/<slug:slug>/pdf/', views.article_pdf, name='article_pdf'),
     path('search/', views.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
     path('vlog/<slug:slug>/', views.vlog_detail, name='vlog_detail'),
@@ -1,51 +1,48 @@
+import os
+
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.utils import timezone
-from .models import Article, ArticleView, Advertisement, Vlog
-from categories.models import Category
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.utils.cache import add_never_cache_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
+from blog.media import serve_media
+from blog.pagecache import on_hit
+from blog.ratelimit import allow, rate_limit
+from blog.surrogate import tag
+from . import pdf
+from .caching import article_sidebar, current_advertisements, home_blocks
+from .models import Article, Vlog
+from .suggest import suggest
+from .tracking import record_view, record_vlog_view
 from authors.models import Author
 
 
 def home(request):
     """Display the homepage with featured articles carousel and latest articles"""
-    # Get featured articles for carousel
-    featured_articles = Article.objects.filter(
-        is_published=True,
-        is_featured=True
-    ).order_by('-published_date')[:5]
+    # Featured articles for the carousel and the latest vlogs (cached)
+    blocks = home_blocks()
     
     # Get latest articles
-    latest_articles = Article.objects.filter(
-        is_published=True
-    ).order_by('-published_date')
-    
-    # Get categories for filtering
-    categories = Category.objects.filter(is_active=True).order_by('order')
-    
-    # Get active advertisements
-    advertisements = Advertisement.objects.filter(
-        is_active=True,
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now()
-    ).order_by('-priority', '-created_date')
+    latest_articles = Article.objects.published().cards().order_by('-published_date')
     
-    # Get latest vlogs
-    latest_vlogs = Vlog.objects.filter(
-        is_published=True
-    ).order_by('-published_date')[:3]
+    # Get active advertisements (cached)
+    advertisements = current_advertisements()
     
     # Pagination for latest articles
     paginator = Paginator(latest_articles, 6)  # Show 6 articles per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+
+    tag(request, 'articles', 'vlogs', 'ads', *blocks['featured_articles'], *page_obj, *blocks['latest_vlogs'])
     
     context = {
-        'featured_articles': featured_articles,
+        'featured_articles': blocks['featured_articles'],
         'page_obj': page_obj,
-        'categories': categories,
         'advertisements': advertisements,
-        'latest_vlogs': latest_vlogs,
+        'latest_vlogs': blocks['latest_vlogs'],
     }
     return render(request, 'articles/home.html', context)
 
@@ -54,67 +51,78 @@ def article_detail(request, slug):
     """Display detailed information about an article"""
     article = get_object_or_404(Article, slug=slug, is_published=True)
 
-    # Get related articles
-    related_articles = article.get_related_articles()
-
-    # Track view count (simple implementation)
-    article.view_count += 1
-    article.save(update_fields=['view_count'])
-    
-    # Track detailed view information
-    # Get the user's IP address
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip_address = x_forwarded_for.split(',')[0]
-    else:
-        ip_address = request.META.get('REMOTE_ADDR')
-    
-    # Get user agent
-    user_agent = request.META.get('HTTP_USER_AGENT', '')
-    
-    # Create ArticleView record
-    ArticleView.objects.create(
-        article=article,
-        ip_address=ip_address,
-        user_agent=user_agent
-    )
+    # Track view count, detailed view information and unique readers; a
+    # client reloading the page faster than RATE_LIMITS['view'] isn't counted
+    if allow(request, 'view'):
+        record_view(request, article)
+    on_hit(request, 'articles.tracking.track_article_view', article.pk)
 
     # ✅ Get only approved comments
     approved_comments = article.comments.filter(is_approved=True)
     approved_comments_count = approved_comments.count()
     
-    # Get related popular posts (same category, published)
-    popular_posts = (
-        article.category.articles.filter(is_published=True)
-        .exclude(id=article.id)[:3]  # Exclude current article, limit 3
-    )
+    # Related and popular posts (same category, published; cached)
+    sidebar = article_sidebar(article)
+
+    tag(request, article, *sidebar['related_articles'], *sidebar['popular_posts'])
 
     context = {
         'article': article,
-        'related_articles': related_articles,
+        'related_articles': sidebar['related_articles'],
         'approved_comments': approved_comments,
         'approved_comments_count': approved_comments_count,
-        'popular_posts': popular_posts,
+        'popular_posts': sidebar['popular_posts'],
+        'pdf_export': pdf.available(),
     }
     return render(request, "articles/article_detail.html", context)
 
+
+@require_safe
+def article_pdf(request, slug):
+    """Serve an article as PDF, rendering it in the background on first request"""
+    if not pdf.available():
+        raise Http404("PDF export is not available")
+    article = get_object_or_404(
+        # author_id and category_id: for the surrogate keys
+        Article.objects.only('id', 'slug', 'title', 'updated_date', 'author_id', 'category_id'),
+        slug=slug, is_published=True,
+    )
+    tag(request, article)
+    path = pdf.ensure_pdf(article)
+    if path is None:
+        response = render(request, 'articles/article_pdf_pending.html', {
+            'article': article,
+            'retry_after': settings.ARTICLE_PDF_RETRY_AFTER,
+        }, status=202)
+        response['Retry-After'] = settings.ARTICLE_PDF_RETRY_AFTER
+        add_never_cache_headers(response)
+        return response
+
+    response = serve_media(request, os.path.relpath(path, settings.MEDIA_ROOT))
+    if response.status_code == 200:
+        response['Content-Disposition'] = f'inline; filename="{article.slug}.pdf"'
+    # The URL stays the same across edits, so browsers revalidate it (ETag)
+    response['Cache-Control'] = 'public, max-age=300'
+    return response
+
 def search(request):
     """Search articles by keyword"""
     query = request.GET.get('q')
     articles = []
     
     if query:
-        articles = Article.objects.filter(
+        articles = Article.objects.published().cards().filter(
             Q(title__icontains=query) | 
             Q(content__icontains=query) | 
-            Q(excerpt__icontains=query),
-            is_published=True
+            Q(excerpt__icontains=query)
         ).order_by('-published_date').distinct()
     
     # Pagination
     paginator = Paginator(articles, 10)  # Show 10 articles per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+
+    tag(request, 'articles', *page_obj)
     
     context = {
         'query': query,
@@ -123,11 +131,19 @@ def search(request):
     return render(request, 'articles/search_results.html', context)
 
 
+@cache_control(public=True, max_age=60)
+def search_suggest(request):
+    """Return search-as-you-type suggestions for the navbar search box as JSON"""
+    query = request.GET.get('q', '')[:100]
+    return JsonResponse({'query': query, 'results': suggest(query)})
+
+
 def about(request):
     """Display the about page"""
     return render(request, 'articles/about.html')
 
 
+@rate_limit('contact')
 def contact(request):
     """Display the contact page with form"""
     if request.method == 'POST':
@@ -152,14 +168,16 @@ def vlog_detail(request, slug):
     vlog = get_object_or_404(Vlog, slug=slug, is_published=True)
     
     # Track view count
-    vlog.view_count += 1
-    vlog.save(update_fields=['view_count'])
+    if allow(request, 'view'):
+        record_vlog_view(request, vlog)
+    on_hit(request, 'articles.tracking.track_vlog_view', vlog.pk)
     
     # Get related vlogs
-    related_vlogs = Vlog.objects.filter(
-        category=vlog.category,
-        is_published=True
+    related_vlogs = Vlog.objects.published().cards().filter(
+        category=vlog.category_id
     ).exclude(id=vlog.id)[:3]
+
+    tag(request, vlog, *related_vlogs)
     
     context = {
         'vlog': vlog,
@@ -171,19 +189,17 @@ def vlog_detail(request, slug):
 def vlog_list(request):
     """Display a list of vlogs"""
     # Get all published vlogs
-    vlogs = Vlog.objects.filter(is_published=True).order_by('-published_date')
-    
-    # Get categories for filtering
-    categories = Category.objects.filter(is_active=True).order_by('order')
+    vlogs = Vlog.objects.published().cards().order_by('-published_date')
     
     # Pagination
     paginator = Paginator(vlogs, 6)  # Show 6 vlogs per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+
+    tag(request, 'vlogs', *page_obj)
     
     context = {
         'vlogs': page_obj,
         'page_obj': page_obj,
-        'categories': categories,
     }
     return render(request, 'articles/vlog_list.html', context)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
+from blog.surrogate import tag
 from .models import Author
 
 
@@ -11,6 +12,9 @@ def author_list(request):
     paginator = Paginator(authors, 10)  # Show 10 authors per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+
+    # 'articles': the published article counts change with the article lists
+    tag(request, 'authors', 'articles', *page_obj)
     
     context = {
         'page_obj': page_obj,
@@ -23,12 +27,14 @@ def author_detail(request, pk):
     author = get_object_or_404(Author, pk=pk, is_active=True)
     
     # Get published articles by this author
-    articles = author.articles.filter(is_published=True).order_by('-published_date')
+    articles = author.articles.published().cards().order_by('-published_date')
     
     # Pagination for articles
     paginator = Paginator(articles, 5)  # Show 5 articles per page
     page_number = request.GET.get('page')
     articles_page = paginator.get_page(page_number)
+
+    tag(request, 'articles', author, *articles_page)
     
     context = {
         'author': author,
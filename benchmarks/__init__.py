@@ -0,0 +1,6 @@
+"""Performance benchmarks.
+
+Each module is a standalone script; run them from the project root, e.g.::
+
+    python -m benchmarks.db_connections
+"""
@@ -0,0 +1,157 @@
+"""Queries and latency of the admin change lists on a large seeded dataset.
+
+Seeds a throwaway test database with article views, comments, articles and
+categories (``ANALYZE`` afterwards, so table statistics exist), then loads
+change list pages as a superuser. Seeding spreads the views over a year with
+SQLite date functions, so run it with the development settings. Modes:
+
+- ``stock``: what the admins used to do. No ``list_select_related``, the
+  per-row ``Category.article_count()``, Django's paginator with ``COUNT(*)``,
+  the full result count and Django's ``date_hierarchy`` tag.
+- ``tuned``: the admins as configured.
+
+Pages: first page unfiltered, a date-filtered page and a deep page of the
+views, the comments, articles and categories.
+
+Run it with::
+
+    python -m benchmarks.admin_changelist --views 500000 --comments 50000 --repeat 10
+"""
+import argparse
+import random
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from unittest import mock
+
+from .common import print_table, setup_django, summarize, teardown
+
+
+BATCH = 5000
+
+
+def seed(views, comments, articles):
+    from django.db import connections, router
+    from django.utils import timezone
+
+    from articles.models import Article, ArticleView
+    from authors.models import Author
+    from categories.models import Category
+    from comments.models import Comment
+
+    authors = [Author.objects.create_user(f'bench{n}', first_name='Bench', last_name=str(n)) for n in range(20)]
+    categories = [Category.objects.create(name=f'Category {n}') for n in range(30)]
+    now = timezone.now()
+    Article.objects.bulk_create(
+        Article(
+            title=f'Article {n}', slug=f'article-{n}', excerpt='Summary.', content='Body.',
+            author=authors[n % len(authors)], category=categories[n % len(categories)],
+            is_published=n % 5 != 0, published_date=now - timedelta(hours=n),
+        )
+        for n in range(articles)
+    )
+    article_ids = list(Article.objects.values_list('pk', flat=True))
+
+    def batches(total, make):
+        for start in range(0, total, BATCH):
+            yield [make(n) for n in range(start, min(total, start + BATCH))]
+
+    for batch in batches(views, lambda n: ArticleView(
+        article_id=random.choice(article_ids), ip_address=f'10.{n % 250}.{n // 250 % 250}.1',
+        user_agent='Mozilla/5.0', referrer='https://example.com/',
+    )):
+        ArticleView.objects.bulk_create(batch)
+    # viewed_at is auto_now_add: spread the views over the last year afterwards
+    ArticleView.objects.update(viewed_at=now)
+    with connections[router.db_for_write(ArticleView)].cursor() as cursor:
+        table = ArticleView._meta.db_table
+        cursor.execute(f"UPDATE {table} SET viewed_at = datetime(viewed_at, '-' || (id % 365) || ' days')")
+    for batch in batches(comments, lambda n: Comment(
+        article_id=random.choice(article_ids), author_name=f'Reader {n}',
+        author_email=f'reader{n}@example.com', content='Nice post.', is_approved=n % 3 != 0,
+    )):
+        Comment.objects.bulk_create(batch)
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def stock_admins():
+    """Patch the admins back to Django's defaults"""
+    from django.contrib import admin
+    from django.core.paginator import Paginator
+
+    from articles.admin import ArticleAdmin, ArticleViewAdmin, VlogAdmin
+    from categories.admin import CategoryAdmin
+    from comments.admin import CommentAdmin
+
+    stack = ExitStack()
+    for admin_class in (ArticleAdmin, VlogAdmin, CommentAdmin):
+        stack.enter_context(mock.patch.object(admin_class, 'list_select_related', False))
+    for admin_class in (ArticleViewAdmin, CommentAdmin):
+        stack.enter_context(mock.patch.object(admin_class, 'paginator', Paginator))
+        stack.enter_context(mock.patch.object(admin_class, 'show_full_result_count', True))
+        stack.enter_context(mock.patch.object(admin_class, 'change_list_template', 'admin/export_change_list.html'))
+    stack.enter_context(mock.patch.object(CategoryAdmin, 'get_queryset', admin.ModelAdmin.get_queryset))
+    stack.enter_context(mock.patch.object(CategoryAdmin, 'article_count', lambda self, obj: obj.article_count()))
+    return stack
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--views', type=int, default=200_000)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--articles', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    old_config = setup_django(test_database=True)
+    try:
+        from django.db import connections
+        from django.test import Client, override_settings
+        from django.test.utils import CaptureQueriesContext
+
+        from authors.models import Author
+
+        start = time.perf_counter()
+        seed(args.views, args.comments, args.articles)
+        print(f'Seeded {args.views} views and {args.comments} comments in {time.perf_counter() - start:.1f} s')
+
+        month = (time.strftime('%Y'), time.strftime('%m').lstrip('0'))
+        pages = [
+            ('views', '/admin/articles/articleview/'),
+            ('views this month', f'/admin/articles/articleview/?viewed_at__year={month[0]}&viewed_at__month={month[1]}'),
+            ('views page 200', '/admin/articles/articleview/?p=200'),
+            ('comments', '/admin/comments/comment/'),
+            ('comments approved', '/admin/comments/comment/?is_approved__exact=1'),
+            ('articles', '/admin/articles/article/'),
+            ('categories', '/admin/categories/category/'),
+        ]
+        user = Author.objects.create_superuser('admin-bench', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(user)
+
+        rows = []
+        for mode in ('stock', 'tuned'):
+            with ExitStack() as stack, override_settings(PAGE_CACHE_ENABLED=False):
+                if mode == 'stock':
+                    stack.enter_context(stock_admins())
+                for name, url in pages:
+                    client.get(url)
+                    samples = []
+                    for _ in range(args.repeat):
+                        with CaptureQueriesContext(connections['default']) as captured:
+                            started = time.perf_counter()
+                            response = client.get(url)
+                            samples.append(time.perf_counter() - started)
+                    assert response.status_code == 200, (url, response.status_code)
+                    row = {'mode': mode, 'page': name, 'queries': len(captured)}
+                    row.update(summarize(samples))
+                    rows.append(row)
+        print_table(rows, ['mode', 'page', 'queries', 'mean_ms', 'p50_ms', 'p95_ms'])
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
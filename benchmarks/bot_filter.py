@@ -0,0 +1,88 @@
+"""Throughput of the bot classifier used by view tracking.
+
+Replays a synthetic stream of user agents (a few very common browsers, a
+long tail of rare strings and a share of bots) through three classifiers:
+a naive loop over the tokens and patterns, the compiled regex without caching and the
+cached ``articles.bots.is_bot``::
+
+    python -m benchmarks.bot_filter --lookups 200000
+"""
+import argparse
+import random
+import re
+import time
+
+from .common import print_table, setup_django
+
+
+BROWSERS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; SM-A546E) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:130.0) Gecko/20100101 Firefox/130.0',
+]
+BOTS = [
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)',
+    'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
+    'WhatsApp/2.23.20.0',
+    'Mozilla/5.0 (compatible; UptimeRobot/2.0; http://www.uptimerobot.com/)',
+    'curl/8.5.0',
+    'python-requests/2.32.3',
+]
+
+
+def user_agent_stream(count, seed=0):
+    rng = random.Random(seed)
+    for n in range(count):
+        roll = rng.random()
+        if roll < 0.7:
+            yield BROWSERS[min(int(rng.expovariate(1.0)), len(BROWSERS) - 1)]
+        elif roll < 0.85:
+            yield rng.choice(BOTS)
+        else:
+            # Long tail: version/device variants seen once or twice
+            yield f'{rng.choice(BROWSERS)} build/{rng.randrange(100000)}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lookups', type=int, default=200000)
+    args = parser.parse_args()
+
+    setup_django()
+    from articles.bots import BOT_PATTERNS, BOT_TOKENS, _matcher, is_bot
+
+    agents = list(user_agent_stream(args.lookups))
+    matcher = _matcher()
+    patterns = [re.compile(pattern) for pattern in BOT_PATTERNS]
+
+    def naive(user_agent):
+        lowered = user_agent.lower()
+        return (
+            any(token in lowered for token in BOT_TOKENS)
+            or any(pattern.search(lowered) for pattern in patterns)
+        )
+
+    def compiled(user_agent):
+        return matcher.search(user_agent.lower()) is not None
+
+    rows = []
+    for name, classify in (('token loop', naive), ('compiled regex', compiled), ('regex + LRU', is_bot)):
+        is_bot.cache_clear()
+        start = time.perf_counter()
+        bots = sum(1 for user_agent in agents if classify(user_agent))
+        elapsed = time.perf_counter() - start
+        rows.append({
+            'classifier': name,
+            'lookups_per_s': round(len(agents) / elapsed),
+            'us_per_lookup': elapsed / len(agents) * 1e6,
+            'bots': bots,
+        })
+    print_table(rows, ['classifier', 'lookups_per_s', 'us_per_lookup', 'bots'])
+    print(f'LRU: {is_bot.cache_info()}')
+
+
+if __name__ == '__main__':
+    main()
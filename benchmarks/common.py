@@ -0,0 +1,58 @@
+import os
+import statistics
+
+
+def setup_django(settings_module='blog.settings.development', test_database=False):
+    """Configure Django; optionally create throwaway test databases.
+
+    Returns the old database config to pass to ``teardown`` when
+    ``test_database`` is true, so benchmarks never touch real data.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    if test_database:
+        from django.test.utils import setup_databases, setup_test_environment
+        setup_test_environment()
+        return setup_databases(verbosity=0, interactive=False)
+    return None
+
+
+def teardown(old_config):
+    """Drop the databases created by ``setup_django(test_database=True)``"""
+    from django.test.utils import teardown_databases, teardown_test_environment
+    teardown_databases(old_config, verbosity=0)
+    teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Return mean/p50/p95/p99 in milliseconds for timings given in seconds"""
+    return {
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def print_table(rows, columns):
+    """Print ``rows`` (a list of dicts) as an aligned text table"""
+    widths = {
+        column: max(len(column), *(len(_format(row.get(column))) for row in rows))
+        for column in columns
+    }
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(_format(row.get(column)).ljust(widths[column]) for column in columns))
+
+
+def _format(value):
+    if isinstance(value, float):
+        return f'{value:.3f}'
+    return '' if value is None else str(value)
@@ -0,0 +1,87 @@
+"""Request latency with and without database connection reuse.
+
+Each mode runs in a fresh interpreter with blog.settings.production, so it
+needs a reachable PostgreSQL server configured through the usual DB_*
+variables. Every simulated request goes through Django's request_started /
+request_finished signals, which is where connections are closed or returned
+to the pool, and runs one query::
+
+    python -m benchmarks.db_connections --requests 2000 --threads 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import print_table, setup_django, summarize
+
+
+MODES = {
+    'no-reuse': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '600'},
+    'pool': {'DB_POOL': '1'},
+}
+
+
+def run_child(requests, threads):
+    setup_django('blog.settings.production')
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+
+    from blog.db import pool_stats
+
+    def one_request(_):
+        start = time.perf_counter()
+        request_started.send(sender=None)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        finally:
+            request_finished.send(sender=None)
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        samples = list(executor.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples)
+    result['req_per_s'] = requests / elapsed
+    pool = pool_stats().get('default')
+    if pool:
+        result.update(waits=pool['waits'], timeouts=pool['timeouts'])
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=list(MODES))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.requests, args.threads)
+        return
+
+    rows = []
+    for mode in args.modes:
+        env = dict(os.environ, GUNICORN_THREADS=str(args.threads), **MODES[mode])
+        env['DJANGO_SETTINGS_MODULE'] = 'blog.settings.production'
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_connections', '--child',
+             '--requests', str(args.requests), '--threads', str(args.threads)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        rows.append(dict(json.loads(output.strip().splitlines()[-1]), mode=mode))
+
+    print_table(rows, ['mode', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'req_per_s', 'waits', 'timeouts'])
+
+
+if __name__ == '__main__':
+    main()
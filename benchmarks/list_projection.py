@@ -0,0 +1,97 @@
+"""Cost of loading list pages with full rows versus ``cards()`` projections.
+
+Creates articles with long bodies in a throwaway test database and loads
+pages of them the way the list views do, reading every field a card
+displays. Modes:
+
+- ``full rows``: ``filter(is_published=True)``, what the views used to do
+  (author and category fetched per card).
+- ``full + select_related``: the same with the joins but all columns.
+- ``cards()``: ``Article.objects.published().cards()``.
+
+Run it with::
+
+    python -m benchmarks.list_projection --articles 300 --content-kb 100
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import timedelta
+
+from .common import print_table, setup_django, summarize, teardown
+
+
+def create_articles(count, content_kb):
+    from django.utils import timezone
+
+    from articles.models import Article
+    from authors.models import Author
+    from categories.models import Category
+
+    author = Author.objects.create_user('bench', first_name='Bench', last_name='Writer')
+    category = Category.objects.create(name='Benchmarks')
+    body = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 18 + '\n') * content_kb
+    now = timezone.now()
+    Article.objects.bulk_create(
+        Article(
+            title=f'Long article {n}', slug=f'long-article-{n}', excerpt='A short summary. ' * 5,
+            content=body, author=author, category=category,
+            is_published=True, published_date=now - timedelta(minutes=n),
+        )
+        for n in range(count)
+    )
+
+
+def read_cards(articles):
+    """Touch what a card template displays"""
+    for article in articles:
+        (article.title, article.get_absolute_url(), article.excerpt, article.featured_image,
+         article.published_date, article.author.get_full_name(), article.category.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--articles', type=int, default=300)
+    parser.add_argument('--content-kb', type=int, default=100, help='Approximate body size per article')
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    old_config = setup_django(test_database=True)
+    try:
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from articles.models import Article
+
+        create_articles(args.articles, args.content_kb)
+        pages = max(1, args.articles // args.page_size)
+        modes = [
+            ('full rows', lambda: Article.objects.filter(is_published=True)),
+            ('full + select_related', lambda: Article.objects.filter(is_published=True).select_related('author', 'category')),
+            ('cards()', lambda: Article.objects.published().cards()),
+        ]
+
+        rows = []
+        for name, queryset in modes:
+            samples, peaks, queries = [], [], 0
+            for n in range(args.repeat):
+                offset = (n % pages) * args.page_size
+                tracemalloc.start()
+                start = time.perf_counter()
+                with CaptureQueriesContext(connection) as captured:
+                    read_cards(list(queryset().order_by('-published_date')[offset:offset + args.page_size]))
+                samples.append(time.perf_counter() - start)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                queries = len(captured)
+            row = {'mode': name, 'queries': queries, 'peak_kb': max(peaks) / 1024}
+            row.update(summarize(samples))
+            rows.append(row)
+        print_table(rows, ['mode', 'queries', 'peak_kb', 'mean_ms', 'p50_ms', 'p95_ms'])
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Throughput of media serving for large files.
+
+Writes a large random "image" into a temporary MEDIA_ROOT, runs the project's
+WSGI application in a local wsgiref server and downloads it repeatedly with
+``django.views.static.serve`` (what DEBUG used to route), ``serve_media``
+(whole file, and in 1 MiB ``Range`` chunks) and ``serve_media`` with
+``MEDIA_ACCEL`` (only headers leave Django; the front server would send the
+bytes)::
+
+    python -m benchmarks.media_throughput --size-mb 50 --requests 20
+
+wsgiref has no ``sendfile()``, so the FileResponse numbers are a lower bound
+for gunicorn, which hands the open file to the kernel.
+"""
+import argparse
+import http.client
+import os
+import tempfile
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from .common import print_table, setup_django, summarize
+
+
+CHUNK = 1 << 20
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def fetch(port, path, byte_range=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Range': f'bytes={byte_range[0]}-{byte_range[1]}'} if byte_range else {}
+    connection.request('GET', path, headers=headers)
+    response = connection.getresponse()
+    received = 0
+    while data := response.read(CHUNK):
+        received += len(data)
+    connection.close()
+    return response.status, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size-mb', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.wsgi import get_wsgi_application
+    from django.test import override_settings
+    from django.urls import re_path
+    from django.views.static import serve
+
+    from blog import media
+
+    size = args.size_mb * CHUNK
+    media_root = tempfile.mkdtemp(prefix='media-bench-')
+    with open(os.path.join(media_root, 'large.jpg'), 'wb') as file:
+        for _ in range(args.size_mb):
+            file.write(os.urandom(CHUNK))
+
+    class urls:
+        urlpatterns = [
+            re_path(r'^static-serve/(?P<path>.+)$', serve, {'document_root': media_root}),
+            re_path(r'^media/(?P<path>.+)$', media.serve_media),
+        ]
+
+    overrides = override_settings(
+        MEDIA_ROOT=media_root, ROOT_URLCONF=urls, ALLOWED_HOSTS=['*'],
+        SECURE_SSL_REDIRECT=False, DEBUG=False,
+    )
+    overrides.enable()
+    server = make_server('127.0.0.1', 0, get_wsgi_application(), handler_class=QuietHandler)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def whole(path):
+        return lambda: fetch(port, path)
+
+    def ranged(path):
+        def run():
+            received = 0
+            for start in range(0, size, CHUNK):
+                received += fetch(port, path, (start, min(start + CHUNK, size) - 1))[1]
+            return 206, received
+        return run
+
+    modes = [
+        ('static.serve', whole('/static-serve/large.jpg'), {}),
+        ('serve_media', whole('/media/large.jpg'), {}),
+        ('serve_media, 1 MiB ranges', ranged('/media/large.jpg'), {}),
+        ('serve_media, X-Accel', whole('/media/large.jpg'), {'MEDIA_ACCEL': 'x-accel-redirect'}),
+    ]
+    rows = []
+    try:
+        for name, run, settings in modes:
+            with override_settings(**settings):
+                samples, received = [], 0
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    received += run()[1]
+                    samples.append(time.perf_counter() - start)
+            row = {
+                'mode': name,
+                'MB_from_django': received / CHUNK / args.requests,
+                'MB_per_s': received / CHUNK / sum(samples) if received else None,
+            }
+            row.update(summarize(samples))
+            rows.append(row)
+    finally:
+        server.shutdown()
+        overrides.disable()
+        os.remove(os.path.join(media_root, 'large.jpg'))
+        os.rmdir(media_root)
+    print_table(rows, ['mode', 'MB_from_django', 'MB_per_s', 'mean_ms', 'p50_ms', 'p95_ms'])
+
+
+if __name__ == '__main__':
+    main()
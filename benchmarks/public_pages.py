@@ -0,0 +1,131 @@
+"""Database queries and latency of public pages, with and without sessions.
+
+Requests pages with the test client in a throwaway test database, counting
+queries on every database alias and the ones touching ``django_session``.
+Modes:
+
+- ``django defaults``: database sessions, fallback message storage and the
+  stock ``SessionMiddleware``.
+- ``sessionless reads``: the settings in base.py (cached_db sessions, cookie
+  messages, ``SessionlessReadsMiddleware``).
+
+Flows:
+
+- ``read <url>``: an anonymous GET.
+- ``subscribe + next page``: a newsletter sign-up, then the page it redirects
+  to and its ``/_personalize/`` call for the message.
+
+Run it with::
+
+    python -m benchmarks.public_pages --repeat 50
+"""
+import argparse
+import time
+from contextlib import ExitStack
+
+from .common import print_table, setup_django, summarize, teardown
+
+
+DEFAULTS = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'MESSAGE_STORAGE': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    'SESSIONLESS_READS': False,
+}
+
+
+def create_content():
+    from django.utils import timezone
+
+    from articles.models import Article
+    from authors.models import Author
+    from categories.models import Category
+
+    author = Author.objects.create_user('bench', first_name='Bench', last_name='Writer')
+    category = Category.objects.create(name='Benchmarks')
+    for n in range(12):
+        Article.objects.create(
+            title=f'Article {n}', slug=f'article-{n}', excerpt='Summary.', content='Body. ' * 200,
+            author=author, category=category, is_published=True, published_date=timezone.now(),
+        )
+    return [
+        '/', '/article/article-0/', f'/categories/{category.slug}/', f'/authors/{author.pk}/',
+    ]
+
+
+def capture_queries():
+    """Context manager collecting the queries of every database alias"""
+    from django.db import connections
+    from django.test.utils import CaptureQueriesContext
+
+    stack = ExitStack()
+    contexts = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+    return stack, contexts
+
+
+def measure(client, flow, repeat):
+    samples, queries, session_queries = [], 0, 0
+    for _ in range(repeat):
+        stack, contexts = capture_queries()
+        with stack:
+            start = time.perf_counter()
+            flow(client)
+            samples.append(time.perf_counter() - start)
+        captured = [query['sql'] for context in contexts for query in context.captured_queries]
+        queries = len(captured)
+        session_queries = sum('django_session' in sql for sql in captured)
+    return samples, queries, session_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    old_config = setup_django(test_database=True)
+    try:
+        from django.conf import settings
+        from django.contrib.sessions.models import Session
+        from django.core.cache import cache
+        from django.test import Client, override_settings
+
+        urls = create_content()
+        flows = [(f'read {url}', lambda client, url=url: client.get(url)) for url in urls]
+
+        def subscribe(client):
+            client.post('/newsletter/subscribe/', {'email': f'reader{time.monotonic_ns()}@example.com', 'next': '/'})
+            client.get('/')
+            client.get('/_personalize/')
+        flows.append(('subscribe + next page', subscribe))
+
+        stock_middleware = [
+            'django.contrib.sessions.middleware.SessionMiddleware'
+            if name == 'blog.middleware.SessionlessReadsMiddleware' else name
+            for name in settings.MIDDLEWARE
+        ]
+        modes = [
+            ('django defaults', {**DEFAULTS, 'MIDDLEWARE': stock_middleware}),
+            ('sessionless reads', {}),
+        ]
+
+        rows = []
+        for mode, overrides in modes:
+            with override_settings(RATELIMIT_ENABLED=False, **overrides):
+                for name, flow in flows:
+                    cache.clear()
+                    Session.objects.all().delete()
+                    # Warm up the caches this page uses, then measure
+                    flow(Client())
+                    samples, queries, session_queries = measure(Client(), flow, args.repeat)
+                    row = {
+                        'mode': mode, 'flow': name, 'queries': queries,
+                        'session_queries': session_queries, 'session_rows': Session.objects.count(),
+                    }
+                    row.update(summarize(samples))
+                    rows.append(row)
+        print_table(rows, ['mode', 'flow', 'queries', 'session_queries', 'session_rows', 'mean_ms', 'p50_ms', 'p95_ms'])
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Two-tier cache backend: a per-process LRU in front of a shared cache.
+
+Hot entries are served from process memory, without touching the shared
+backend (the file-based ``default`` cache, or Redis in production). Misses
+fall through to the shared backend and are copied into the local tier.
+
+Each alias (``KEY_PREFIX``) is a namespace with a generation stamp kept in the
+shared backend, and every shared key includes the current generation.
+``clear()`` does not delete anything: it writes a new stamp, which makes the
+old entries unreachable in every worker. Workers re-read the stamp at most
+every ``CHECK_INTERVAL`` seconds and then drop their local tier. A ``set()``
+or ``delete()`` of a single key reaches other workers' local copies only when
+those expire, after ``LOCAL_TIMEOUT`` seconds at most.
+
+Values in the local tier are shared by reference within a process, so cached
+objects must not be mutated by the code that reads them.
+
+Configuration::
+
+    'nav': {
+        'BACKEND': 'blog.cache.TwoTierCache',
+        'LOCATION': 'default',          # alias of the shared cache
+        'KEY_PREFIX': 'nav',            # namespace, unique per alias
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100, 'LOCAL_TIMEOUT': 60, 'CHECK_INTERVAL': 5},
+    }
+"""
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class _LocalTier:
+    """Process-wide LRU of one namespace, shared by the per-thread backend instances"""
+
+    def __init__(self, max_entries):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.generation = None
+        self.checked = 0.0
+        self.stats = Counter()
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location or 'default'
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._check_interval = options.get('CHECK_INTERVAL', 5)
+        self._generation_key = f'generation:{self.key_prefix}'
+        # Django creates one backend instance per thread; the LRU is per process.
+        with _tiers_lock:
+            self._tier = _tiers.setdefault(self.key_prefix, _LocalTier(self._max_entries))
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _generation(self):
+        tier = self._tier
+        now = time.monotonic()
+        if tier.generation is not None and now - tier.checked < self._check_interval:
+            return tier.generation
+
+        generation = self.shared.get(self._generation_key)
+        if generation is None:
+            self.shared.add(self._generation_key, uuid.uuid4().hex[:12], None)
+            generation = self.shared.get(self._generation_key)
+        with tier.lock:
+            if generation != tier.generation:
+                if tier.generation is not None:
+                    tier.stats['invalidations'] += 1
+                tier.entries.clear()
+                tier.generation = generation
+            tier.checked = now
+        return generation
+
+    def _shared_key(self, key, generation):
+        return f'{generation}:{key}'
+
+    def _shared_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _store_local(self, key, generation, value, timeout=DEFAULT_TIMEOUT):
+        expires = self.get_backend_timeout(timeout)
+        if self._local_timeout is not None:
+            local_expires = time.time() + self._local_timeout
+            expires = local_expires if expires is None else min(expires, local_expires)
+        tier = self._tier
+        with tier.lock:
+            if generation != tier.generation:
+                return
+            tier.entries[key] = (expires, value)
+            tier.entries.move_to_end(key)
+            while len(tier.entries) > tier.max_entries:
+                tier.entries.popitem(last=False)
+                tier.stats['evictions'] += 1
+
+    def _drop_local(self, key):
+        with self._tier.lock:
+            self._tier.entries.pop(key, None)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        generation = self._generation()
+        tier = self._tier
+        with tier.lock:
+            entry = tier.entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > time.time():
+                    tier.entries.move_to_end(key)
+                    tier.stats['local_hits'] += 1
+                    return value
+                del tier.entries[key]
+
+        value = self.shared.get(self._shared_key(key, generation), self._missing_key)
+        with tier.lock:
+            tier.stats['misses' if value is self._missing_key else 'shared_hits'] += 1
+        if value is self._missing_key:
+            return default
+        self._store_local(key, generation, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        generation = self._generation()
+        self.shared.set(self._shared_key(key, generation), value, self._shared_timeout(timeout))
+        self._store_local(key, generation, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        generation = self._generation()
+        added = self.shared.add(self._shared_key(key, generation), value, self._shared_timeout(timeout))
+        if added:
+            self._store_local(key, generation, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._drop_local(key)
+        return self.shared.touch(self._shared_key(key, self._generation()), self._shared_timeout(timeout))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._drop_local(key)
+        return self.shared.delete(self._shared_key(key, self._generation()))
+
+    def has_key(self, key, version=None):
+        return self.get(key, self._missing_key, version=version) is not self._missing_key
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._drop_local(key)
+        return self.shared.incr(self._shared_key(key, self._generation()), delta)
+
+    def clear(self):
+        """Invalidate this namespace in every worker by starting a new generation"""
+        generation = uuid.uuid4().hex[:12]
+        self.shared.set(self._generation_key, generation, None)
+        tier = self._tier
+        with tier.lock:
+            tier.entries.clear()
+            tier.generation = generation
+            tier.checked = time.monotonic()
+            tier.stats['invalidations'] += 1
+
+    def stats(self):
+        """Hit/miss/eviction counters of this process's local tier"""
+        tier = self._tier
+        with tier.lock:
+            return {
+                'entries': len(tier.entries),
+                'max_entries': tier.max_entries,
+                'generation': tier.generation,
+                **{name: tier.stats[name] for name in ('local_hits', 'shared_hits', 'misses', 'evictions', 'invalidations')},
+            }
+
+
+def cache_stats():
+    """Return ``{alias: stats}`` for every two-tier cache in CACHES"""
+    return {
+        alias: caches[alias].stats()
+        for alias in settings.CACHES
+        if isinstance(caches[alias], TwoTierCache)
+    }
@@ -0,0 +1,31 @@
+"""Helpers for inspecting database connections."""
+from django.db import connections
+
+
+def pool_stats():
+    """Return connection pool statistics for every pooled database alias.
+
+    The counters come from psycopg_pool and are per worker process:
+    ``checkouts`` requests served, ``waits`` requests that had to queue for a
+    free connection, ``wait_ms`` total time spent queueing and ``timeouts``
+    requests that gave up after the pool ``timeout``.
+    """
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        raw = pool.get_stats()
+        stats[alias] = {
+            'size': raw.get('pool_size', 0),
+            'available': raw.get('pool_available', 0),
+            'max_size': raw.get('pool_max', 0),
+            'checkouts': raw.get('requests_num', 0),
+            'waits': raw.get('requests_queued', 0),
+            'wait_ms': raw.get('requests_wait_ms', 0),
+            'timeouts': raw.get('requests_errors', 0),
+            'connections_opened': raw.get('connections_num', 0),
+            'connections_lost': raw.get('connections_lost', 0),
+            'bad_returns': raw.get('returns_bad', 0),
+        }
+    return stats
@@ -0,0 +1,157 @@
+"""Serving of user uploads under MEDIA_ROOT.
+
+``serve_media`` answers conditional requests (``ETag``/``If-None-Match`` and
+``If-Modified-Since``) with 304s and supports single ``Range`` requests, which
+video players and resumable downloads rely on. Files whose names carry a
+content hash (``MEDIA_IMMUTABLE_PATTERN``) are cached for a year as
+``immutable``; everything else for ``MEDIA_CACHE_MAX_AGE`` seconds.
+
+The bytes themselves are never copied through Python when it can be avoided:
+behind nginx (``MEDIA_ACCEL = 'x-accel-redirect'``) or Apache/lighttpd
+(``'x-sendfile'``) the front server sends the file, otherwise a
+``FileResponse`` is returned, which gunicorn streams with ``sendfile()``.
+"""
+import os
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@lru_cache(maxsize=None)
+def _immutable_re():
+    return re.compile(settings.MEDIA_IMMUTABLE_PATTERN) if settings.MEDIA_IMMUTABLE_PATTERN else None
+
+
+def cache_control(path):
+    """Return the Cache-Control value for the media file at ``path``"""
+    pattern = _immutable_re()
+    if pattern and pattern.search(path):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` (inclusive) for a single byte range.
+
+    Returns None when the header should be ignored (absent, malformed or
+    several ranges; the whole file is sent) and raises ValueError when the
+    range lies outside the file.
+    """
+    match = _RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+class _RangeFile:
+    """Read-only view of ``length`` bytes of an open file from its current offset.
+
+    Keeps ``fileno()`` and ``tell()`` so gunicorn can still ``sendfile()``
+    it; gunicorn stops after Content-Length bytes from the offset.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def _accel_response(path, fullpath):
+    response = HttpResponse()
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + path)
+    else:
+        response['X-Sendfile'] = fullpath
+    # Let the front server pick the type from the file it sends.
+    del response['Content-Type']
+    return response
+
+
+def _file_response(request, fullpath, size, etag):
+    file = open(fullpath, 'rb')
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' in request.META and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(
+            _RangeFile(file, end - start + 1), status=206, filename=os.path.basename(fullpath)
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve the upload at ``path`` relative to MEDIA_ROOT"""
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404('Media file not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('Media file not found')
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if settings.MEDIA_ACCEL:
+            response = _accel_response(path, fullpath)
+        else:
+            response = _file_response(request, fullpath, stat.st_size, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control(path)
+    return response
@@ -0,0 +1,287 @@
+"""Request metrics in Prometheus format.
+
+``MetricsMiddleware`` (first in MIDDLEWARE) records per view (URL name):
+
+- a latency histogram of the whole request, middleware included;
+- database queries and the time spent in them, counted by an execute
+  wrapper installed on each connection (which also feeds slow queries to
+  blog/slowqueries.py);
+- template rendering time, measured by ``TimedDjangoTemplates`` (the
+  template backend) around the outermost ``render()``;
+- responses by status class, and full-page cache results (``X-Page-Cache``).
+
+Each worker aggregates in memory and, at most every
+``METRICS_FLUSH_INTERVAL`` seconds, writes a snapshot to
+``METRICS_DIR/<pid>.json``. ``/metrics`` merges the snapshots of all workers
+(and ``retired.json``, where gunicorn's ``child_exit`` hook folds the counts
+of workers that exited, so counters never go down) with the two-tier cache
+counters, and renders them in the Prometheus text format.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+from . import ratelimit, slowqueries
+from .cache import cache_stats
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CACHE_COUNTERS = ('local_hits', 'shared_hits', 'misses', 'evictions', 'invalidations')
+RETIRED = 'retired.json'
+
+_current = threading.local()
+
+
+class _RequestStats:
+    __slots__ = ('request', 'queries', 'db_seconds', 'template_seconds', 'rendering')
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+
+
+def _new_view():
+    return {
+        'count': 0, 'seconds': 0.0, 'buckets': [0] * len(BUCKETS),
+        'queries': 0, 'db_seconds': 0.0, 'template_seconds': 0.0,
+        'status': {}, 'page_cache': {},
+    }
+
+
+_views = defaultdict(_new_view)
+_lock = threading.Lock()
+_flushed = {'at': time.monotonic()}
+
+
+# Instrumentation
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = getattr(_current, 'stats', None)
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if elapsed >= settings.SLOW_QUERY_THRESHOLD:
+            match = stats.request.resolver_match
+            slowqueries.record(sql, params, elapsed, match.view_name if match else None)
+
+
+def _instrument_connections():
+    # Connection objects are per thread and live as long as it does
+    if getattr(_current, 'instrumented', False):
+        return
+    for connection in connections.all():
+        if _db_wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_db_wrapper)
+    _current.instrumented = True
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = getattr(_current, 'stats', None)
+        if stats is None or stats.rendering:
+            return self.template.render(context, request)
+        stats.rendering = True
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+            stats.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing ``render()`` for the metrics"""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _instrument_connections()
+        stats = _current.stats = _RequestStats(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.stats = None
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        record(
+            match.view_name if match else 'unresolved', elapsed, stats,
+            f'{response.status_code // 100}xx', response.get('X-Page-Cache'),
+        )
+        if time.monotonic() - _flushed['at'] >= settings.METRICS_FLUSH_INTERVAL:
+            flush()
+            slowqueries.flush()
+            ratelimit.flush()
+        return response
+
+
+def record(view, seconds, stats, status, page_cache=None):
+    with _lock:
+        entry = _views[view]
+        entry['count'] += 1
+        entry['seconds'] += seconds
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                entry['buckets'][index] += 1
+                break
+        entry['queries'] += stats.queries
+        entry['db_seconds'] += stats.db_seconds
+        entry['template_seconds'] += stats.template_seconds
+        entry['status'][status] = entry['status'].get(status, 0) + 1
+        if page_cache:
+            entry['page_cache'][page_cache] = entry['page_cache'].get(page_cache, 0) + 1
+
+
+# Sharing between workers
+
+def snapshot():
+    """This worker's counters, JSON-serialisable"""
+    with _lock:
+        views = json.loads(json.dumps(_views))
+    caches = {
+        alias: {name: stats[name] for name in CACHE_COUNTERS}
+        for alias, stats in cache_stats().items()
+    }
+    return {'views': views, 'caches': caches}
+
+
+def _write(path, data):
+    temporary = path.with_suffix(f'.{os.getpid()}.tmp')
+    temporary.write_text(json.dumps(data))
+    os.replace(temporary, path)
+
+
+def flush():
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    _write(directory / f'{os.getpid()}.json', snapshot())
+    _flushed['at'] = time.monotonic()
+
+
+def merge(total, other):
+    """Add the counters of ``other`` into ``total`` (nested dicts and lists)"""
+    for key, value in other.items():
+        if isinstance(value, dict):
+            merge(total.setdefault(key, {}), value)
+        elif isinstance(value, list):
+            current = total.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def collect():
+    """Merge the snapshots of all workers, this one up to date"""
+    flush()
+    total = {}
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        merge(total, _read(path))
+    return total
+
+
+def retire_worker(pid):
+    """Fold the counters of an exited worker into the retired totals"""
+    directory = Path(settings.METRICS_DIR)
+    path = directory / f'{pid}.json'
+    if not path.exists():
+        return
+    retired = merge(_read(directory / RETIRED), _read(path))
+    _write(directory / RETIRED, retired)
+    path.unlink(missing_ok=True)
+
+
+# Exposition
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(data):
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    views = sorted(data.get('views', {}).items())
+    family('blog_request_duration_seconds', 'histogram', 'Request latency by view, middleware included.')
+    for view, entry in views:
+        label = f'view="{_label(view)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, entry['buckets']):
+            cumulative += count
+            lines.append(f'blog_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'blog_request_duration_seconds_bucket{{{label},le="+Inf"}} {entry["count"]}')
+        lines.append(f'blog_request_duration_seconds_sum{{{label}}} {entry["seconds"]}')
+        lines.append(f'blog_request_duration_seconds_count{{{label}}} {entry["count"]}')
+
+    for name, key, help_text in (
+        ('blog_db_queries_total', 'queries', 'Database queries by view.'),
+        ('blog_db_duration_seconds_total', 'db_seconds', 'Time spent in database queries by view.'),
+        ('blog_template_render_seconds_total', 'template_seconds', 'Time spent rendering templates by view.'),
+    ):
+        family(name, 'counter', help_text)
+        for view, entry in views:
+            lines.append(f'{name}{{view="{_label(view)}"}} {entry[key]}')
+
+    family('blog_responses_total', 'counter', 'Responses by view and status class.')
+    for view, entry in views:
+        for status, count in sorted(entry['status'].items()):
+            lines.append(f'blog_responses_total{{view="{_label(view)}",status="{status}"}} {count}')
+
+    family('blog_page_cache_total', 'counter', 'Full-page cache results by view.')
+    for view, entry in views:
+        for result, count in sorted(entry['page_cache'].items()):
+            lines.append(f'blog_page_cache_total{{view="{_label(view)}",result="{_label(result)}"}} {count}')
+
+    family('blog_cache_operations_total', 'counter', 'Two-tier cache lookups and evictions by alias.')
+    for alias, counters in sorted(data.get('caches', {}).items()):
+        for name, count in sorted(counters.items()):
+            lines.append(f'blog_cache_operations_total{{cache="{_label(alias)}",result="{name}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_response():
+    return HttpResponse(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,106 @@
+import logging
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+from . import surrogate
+from .routers import replica_reads
+
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Readable by JavaScript: tells personalize.js that messages are waiting
+MESSAGES_HINT_COOKIE = 'pending_messages'
+
+
+class ReplicaRoutingMiddleware:
+    """Let public read requests use the read replicas.
+
+    A reader who just submitted a form (commented, subscribed) gets a short
+    lived cookie that keeps their reads on the primary, so they see their own
+    write even if the replicas lag behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        public_read = (
+            request.method in SAFE_METHODS
+            and not pinned
+            and not request.path.startswith(settings.REPLICA_EXCLUDED_PATHS)
+        )
+        with replica_reads(public_read):
+            response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=request.is_secure(),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class SurrogateKeyMiddleware:
+    """Send the surrogate keys a view tagged the request with (blog/surrogate.py)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            value = surrogate.header_value(request)
+            if value:
+                response[settings.SURROGATE_KEY_HEADER] = value
+        return response
+
+
+class MessagesHintMiddleware:
+    """Flag responses that queued flash messages with a cookie scripts can read.
+
+    Pages don't render messages themselves (so they can be cached); the flag
+    makes the next page fetch them from ``/_personalize/``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        storage = getattr(request, '_messages', None)
+        if storage is not None and storage.added_new:
+            response.set_cookie(
+                MESSAGES_HINT_COOKIE, '1',
+                max_age=5 * 60,
+                secure=request.is_secure(),
+                samesite='Lax',
+            )
+        return response
+
+
+class SessionlessReadsMiddleware(SessionMiddleware):
+    """SessionMiddleware that never starts a session on an anonymous read.
+
+    Sessions are loaded lazily, so a read without a session cookie costs
+    nothing unless something writes to ``request.session``; with
+    SESSIONLESS_READS such a write is dropped (and logged) instead of
+    creating a session and sending its cookie.
+    """
+
+    def process_response(self, request, response):
+        if (
+            settings.SESSIONLESS_READS
+            and request.method in SAFE_METHODS
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        ):
+            if request.session.modified:
+                logger.warning('Not starting a session for the anonymous read of %s', request.path)
+            return response
+        return super().process_response(request, response)
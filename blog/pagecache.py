@@ -0,0 +1,271 @@
+"""Full-page cache for anonymous readers.
+
+``PageCacheMiddleware`` stores the rendered response of the views listed in
+``PAGE_CACHE_VIEWS`` in the ``PAGE_CACHE_ALIAS`` cache and serves it to readers
+without a session or replica pin cookie. Pages are keyed by scheme, host, path
+and the query parameters in ``PAGE_CACHE_QUERY_PARAMS``; other parameters
+(``utm_source``, cache busters) share the page's entry, and only requests for
+one of the ``PAGE_CACHE_HOSTS`` are cached (``ALLOWED_HOSTS`` is ``*``), so
+clients can't fill the cache with copies:
+
+- Fresh for ``PAGE_CACHE_TIMEOUT`` seconds, or until one of the page's
+  surrogate keys (blog/surrogate.py) is purged.
+- After that the page is stale. The first request to notice takes a lock
+  (``cache.add``) and renders it again; everyone else gets the stale copy
+  meanwhile. Stale copies are kept for ``PAGE_CACHE_STALE_TIMEOUT`` seconds.
+- On a miss, requests that don't get the lock wait up to ``PAGE_CACHE_WAIT``
+  seconds for the one rendering it, so a spike on a new page costs one
+  render instead of hundreds.
+- If rendering fails with a database error, the stale copy is served.
+
+Views with side effects register them with ``on_hit`` (e.g. view counting);
+they are stored with the page and replayed in a background thread on every
+hit. At most ``PAGE_CACHE_REPLAY_QUEUE`` hits wait for that thread; beyond
+that, hits are served without their side effects (counted in
+``replay_stats``), so a traffic spike can't pile up work in memory.
+
+Purges update a map of key -> purge time in the default cache (shared by all
+hosts, unlike the page entries), which each worker re-reads at most every
+``PAGE_CACHE_CHECK_INTERVAL`` seconds. Two
+workers purging at the same instant can lose one update; the page then stays
+until its ``PAGE_CACHE_TIMEOUT``.
+"""
+import hashlib
+import logging
+import queue
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, close_old_connections
+from django.http import HttpRequest, HttpResponse
+from django.utils.module_loading import import_string
+
+from . import surrogate
+
+
+logger = logging.getLogger(__name__)
+
+PURGES_KEY = 'pagecache:purges'
+LOCK_KEY = 'pagecache:lock:{}'
+ENTRY_KEY = 'pagecache:page:{}'
+WAIT_STEP = 0.05
+# Request headers the replayed side effects get to see
+REPLAYED_META = ('REMOTE_ADDR', 'HTTP_X_FORWARDED_FOR', 'HTTP_USER_AGENT', 'HTTP_REFERER')
+STORED_HEADERS = ('Content-Type', 'Content-Language', 'Cache-Control', 'Expires', 'Last-Modified')
+
+
+def _cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def _shared_cache():
+    return caches['default']
+
+
+# Invalidation
+
+_purges = {'times': {}, 'checked': 0.0}
+_purges_lock = threading.Lock()
+
+
+def _purge_times():
+    now = time.monotonic()
+    if now - _purges['checked'] >= settings.PAGE_CACHE_CHECK_INTERVAL:
+        with _purges_lock:
+            _purges['times'] = _shared_cache().get(PURGES_KEY) or {}
+            _purges['checked'] = now
+    return _purges['times']
+
+
+def expire(keys):
+    """Mark the pages tagged with any of ``keys`` stale"""
+    now = time.time()
+    oldest = now - settings.PAGE_CACHE_STALE_TIMEOUT
+    with _purges_lock:
+        times = {
+            key: stamp for key, stamp in (_shared_cache().get(PURGES_KEY) or {}).items()
+            if stamp > oldest
+        }
+        times.update(dict.fromkeys(keys, now))
+        _shared_cache().set(PURGES_KEY, times, settings.PAGE_CACHE_STALE_TIMEOUT)
+        _purges.update(times=times, checked=time.monotonic())
+
+
+def is_fresh(entry):
+    if time.time() - entry['created'] > settings.PAGE_CACHE_TIMEOUT:
+        return False
+    times = _purge_times()
+    return all(times.get(key, 0) < entry['created'] for key in entry['keys'])
+
+
+def page_key(request):
+    """The cache key of ``request``'s page"""
+    params = sorted(
+        (name, value) for name, value in request.GET.items()
+        if name in settings.PAGE_CACHE_QUERY_PARAMS
+    )
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{urlencode(params)}'
+    return hashlib.md5(url.encode()).hexdigest()
+
+
+# Side effects
+
+_replays = queue.Queue()
+_replay_stats = {'dropped': 0}
+_replay_thread = {'thread': None}
+_replay_lock = threading.Lock()
+
+
+def on_hit(request, func, *args):
+    """Run ``func(request, *args)`` (a dotted path) whenever the cached page is served"""
+    request.__dict__.setdefault('page_cache_hits', []).append((func, args))
+
+
+def _snapshot(request):
+    copy = HttpRequest()
+    copy.method = 'GET'
+    copy.path = copy.path_info = request.path
+    copy.META = {name: request.META[name] for name in REPLAYED_META if name in request.META}
+    return copy
+
+
+def _replay(calls, request):
+    close_old_connections()
+    try:
+        for func, args in calls:
+            import_string(func)(request, *args)
+    except Exception:
+        logger.exception('Replaying the side effects of %s failed', request.path)
+    finally:
+        close_old_connections()
+
+
+def _replay_forever():
+    while True:
+        _replay(*_replays.get())
+
+
+def _queue_replay(calls, request):
+    with _replay_lock:
+        if _replay_thread['thread'] is None:
+            thread = threading.Thread(target=_replay_forever, name='pagecache', daemon=True)
+            thread.start()
+            _replay_thread['thread'] = thread
+        if _replays.qsize() >= settings.PAGE_CACHE_REPLAY_QUEUE:
+            _replay_stats['dropped'] += 1
+            if _replay_stats['dropped'] % 1000 == 1:
+                logger.warning('Page cache replay queue full, %d hits dropped so far', _replay_stats['dropped'])
+            return
+        _replays.put((calls, request))
+
+
+def replay_stats():
+    """Hits waiting for their side effects, and hits served without them"""
+    return {'queued': _replays.qsize(), 'dropped': _replay_stats['dropped']}
+
+
+# Middleware
+
+def _response(entry, state):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response['Age'] = int(max(0, time.time() - entry['created']))
+    response['X-Page-Cache'] = state
+    return response
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        state = request.__dict__.pop('_page_cache', None)
+        if state is not None:
+            key, started, locked = state
+            # A stale copy served after an error has the header already
+            rendered = not response.has_header('X-Page-Cache')
+            try:
+                if rendered and self._storable(response):
+                    self._store(request, key, started, response)
+            finally:
+                if locked:
+                    _cache().delete(LOCK_KEY.format(key))
+            if rendered:
+                response['X-Page-Cache'] = 'miss'
+        return response
+
+    def _eligible(self, request):
+        return (
+            settings.PAGE_CACHE_ENABLED
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in settings.PAGE_CACHE_VIEWS
+            and request.get_host() in settings.PAGE_CACHE_HOSTS
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self._eligible(request):
+            return None
+        key = page_key(request)
+        started = time.time()
+        cache = _cache()
+        entry = cache.get(ENTRY_KEY.format(key))
+        if entry is not None and is_fresh(entry):
+            return self._serve(request, entry, 'hit')
+
+        locked = cache.add(LOCK_KEY.format(key), 1, settings.PAGE_CACHE_LOCK_TIMEOUT)
+        if not locked:
+            if entry is not None:
+                return self._serve(request, entry, 'stale')
+            # Someone else is rendering it: wait for their copy
+            deadline = time.monotonic() + settings.PAGE_CACHE_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(WAIT_STEP)
+                entry = cache.get(ENTRY_KEY.format(key))
+                if entry is not None:
+                    return self._serve(request, entry, 'hit')
+        request._page_cache = (key, started, locked)
+        request._page_cache_stale = entry
+        return None
+
+    def process_exception(self, request, exception):
+        entry = request.__dict__.get('_page_cache_stale')
+        if entry is not None and isinstance(exception, DatabaseError):
+            logger.warning('Serving a stale copy of %s: %s', request.path, exception)
+            return self._serve(request, entry, 'stale')
+        return None
+
+    def _serve(self, request, entry, state):
+        if entry['hits']:
+            _queue_replay(entry['hits'], _snapshot(request))
+        # Lets SurrogateKeyMiddleware send the page's keys
+        request.surrogate_keys = set(entry['keys'])
+        return _response(entry, state)
+
+    def _storable(self, response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'private' not in response.get('Cache-Control', '')
+            and 'no-store' not in response.get('Cache-Control', '')
+            and 'Cookie' not in response.get('Vary', '')
+        )
+
+    def _store(self, request, key, started, response):
+        entry = {
+            'content': response.content,
+            'status': response.status_code,
+            'headers': {name: response[name] for name in STORED_HEADERS if name in response},
+            # When rendering started: a purge during the render makes it stale
+            'created': started,
+            'keys': sorted(getattr(request, 'surrogate_keys', set()) | {surrogate.SITE_KEY}),
+            'hits': getattr(request, 'page_cache_hits', []),
+        }
+        _cache().set(ENTRY_KEY.format(key), entry, settings.PAGE_CACHE_STALE_TIMEOUT)
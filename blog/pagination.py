@@ -0,0 +1,62 @@
+"""Admin change list pagination for tables with millions of rows.
+
+Django's paginator runs ``COUNT(*)`` over the whole filtered queryset on
+every change list page, which reads every row (or index entry) of a large
+table. ``EstimatedCountPaginator`` avoids that:
+
+- Unfiltered lists use the row estimate the database keeps for its query
+  planner (``pg_class.reltuples``, ``information_schema.tables.table_rows``,
+  ``sqlite_stat1`` after ``ANALYZE``) once it passes ``estimate_threshold``.
+- Filtered lists count at most ``count_limit`` rows. Beyond that the list
+  shows ``count_limit`` rows' worth of pages: narrow the filters to see
+  further back.
+
+Use it with ``show_full_result_count = False``, or the change list runs its
+own unfiltered ``COUNT(*)``.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_rows(model, using):
+    """The planner's estimate of the number of rows of ``model``'s table, or None"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # One row per index; each stat starts with the number of rows
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            counts = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+            return max(counts) if counts else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    estimate_threshold = 100_000
+    count_limit = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
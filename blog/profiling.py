@@ -0,0 +1,196 @@
+"""On-demand sampling profiles of single requests.
+
+A request is profiled when it asks for it and is allowed to:
+
+- a staff user adds ``?profile=1`` (``PROFILE_PARAM``) to the URL, or
+- anyone sends a token from ``manage.py profile_token`` in the
+  ``PROFILE_HEADER`` header (signed with SECRET_KEY, valid for
+  ``PROFILE_TOKEN_MAX_AGE`` seconds), e.g. to profile a page as an anonymous
+  reader sees it.
+
+``ProfilingMiddleware`` is first in MIDDLEWARE, so the whole Django stack is
+profiled. A sampler thread reads the request thread's stack every
+``PROFILE_INTERVAL`` seconds (``sys._current_frames``) and counts identical
+stacks. Staff status is only known once AuthenticationMiddleware has run, so
+a ``?profile=1`` request with a session cookie is sampled and the profile is
+dropped if the user turns out not to be staff.
+
+Profiles are written in the collapsed stack format (``frame;frame;frame
+count`` per line), which flamegraph.pl, speedscope and most flame graph
+viewers read, to ``PROFILE_DIR``. Only the newest ``PROFILE_KEEP`` are kept.
+The response names the file in ``X-Profile``; staff can list and download
+profiles at ``/admin/profiles/``.
+
+Requests that don't ask for a profile only pay for a header lookup and a
+substring test on the query string.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.text import slugify
+
+
+logger = logging.getLogger(__name__)
+
+SALT = 'blog.profiling'
+SUFFIX = '.collapsed'
+NAME_RE = re.compile(r'^[\w.-]+\.collapsed$')
+
+_ROOT = str(Path(__file__).resolve().parent.parent) + os.sep
+# One profile at a time per process: sampling is cheap, but not free
+_busy = threading.Lock()
+
+
+# Tokens
+
+def make_token():
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+# Sampling
+
+class Sampler(threading.Thread):
+    """Count the stacks of thread ``ident`` every ``interval`` seconds"""
+
+    def __init__(self, ident, interval):
+        super().__init__(name='profiler', daemon=True)
+        self.target = ident
+        self.interval = interval
+        self.stacks = Counter()
+        self.labels = {}
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is not None:
+                self.stacks[self._stack(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def _label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(_ROOT):
+                filename = filename[len(_ROOT):]
+            elif 'site-packages' in filename:
+                filename = filename.split('site-packages' + os.sep, 1)[1]
+            label = self.labels[code] = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+        return label
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        # Collapsed stacks go from the root to the leaf
+        return ';'.join(reversed(labels))
+
+
+# Storage
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def save(request, sampler, seconds):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S-%f')
+    path_slug = slugify(request.path.replace('/', '-'))[:60] or 'root'
+    name = f'{stamp}-{request.method.lower()}-{path_slug}-{seconds * 1000:.0f}ms{SUFFIX}'
+    lines = [f'{stack.replace(" ", "_")} {count}' for stack, count in sampler.stacks.most_common()]
+    (directory / name).write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    prune()
+    return name
+
+
+def profiles():
+    """The stored profiles, newest first"""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    entries = []
+    for path in directory.glob(f'*{SUFFIX}'):
+        stat = path.stat()
+        entries.append({
+            'name': path.name,
+            'size': stat.st_size,
+            'created': datetime.fromtimestamp(stat.st_mtime, tz=timezone.get_current_timezone()),
+        })
+    return sorted(entries, key=lambda entry: entry['name'], reverse=True)
+
+
+def profile_path(name):
+    """The path of profile ``name``, or None if there is no such profile"""
+    if not NAME_RE.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def prune():
+    for entry in profiles()[settings.PROFILE_KEEP:]:
+        (profile_dir() / entry['name']).unlink(missing_ok=True)
+
+
+# Middleware
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _requested(self, request):
+        token = request.META.get(settings.PROFILE_HEADER)
+        if token is not None:
+            return valid_token(token)
+        return (
+            settings.PROFILE_PARAM in request.META.get('QUERY_STRING', '')
+            and request.GET.get(settings.PROFILE_PARAM) == '1'
+            and settings.SESSION_COOKIE_NAME in request.COOKIES
+        )
+
+    def __call__(self, request):
+        if not self._requested(request) or not _busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            sampler = Sampler(threading.get_ident(), settings.PROFILE_INTERVAL)
+            start = time.perf_counter()
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            seconds = time.perf_counter() - start
+        finally:
+            _busy.release()
+
+        user = getattr(request, 'user', None)
+        allowed = settings.PROFILE_HEADER in request.META or (user is not None and user.is_staff)
+        if allowed:
+            try:
+                response['X-Profile'] = save(request, sampler, seconds)
+            except OSError:
+                logger.exception('Could not save the profile of %s', request.path)
+        return response
@@ -0,0 +1,217 @@
+"""Token-bucket rate limiting of write endpoints.
+
+Every client (IP address, or its /64 network for IPv6) has one bucket per
+route named in ``RATE_LIMITS``. A limit ``'5/10m'`` holds up to 5 tokens and
+refills at 5 per 10 minutes; each request takes a token and is refused with
+"429 Too Many Requests" and ``Retry-After`` when none is left. Form posts also
+take a token from the client's ``writes`` bucket, which caps all of them
+combined.
+
+Buckets are kept in the ``RATELIMIT_CACHE`` alias: a cache in each worker's
+memory by default, Redis (shared by all workers) when configured. If that
+cache fails, each worker falls back to buckets in its own memory (so the
+limit is per worker until the cache is back). Reading and writing a bucket
+are two cache calls, so two simultaneous requests can both take the last
+token; that slack is accepted. The ``LOCAL_ROUTES`` buckets (the per-view
+gate, checked on every page view) always stay in the worker's memory:
+they only decide whether a view is counted. Blocked request counts are
+kept per worker and added to the totals in the default cache with the
+metrics flush (blog/metrics.py), not on every blocked request.
+
+Usage::
+
+    @rate_limit('comment')
+    def add_comment(request, article_slug): ...
+
+    if allow(request, 'view'):
+        record_view(request, article)
+"""
+import ipaddress
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+
+logger = logging.getLogger(__name__)
+
+WRITES = 'writes'
+LOCAL_ROUTES = ('view',)
+BLOCKED_KEY = 'ratelimit:blocked:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+_RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Return ``(capacity, tokens per second)`` for a rate like ``'5/10m'``"""
+    match = _RATE_RE.match(rate.replace(' ', ''))
+    if not match:
+        raise ValueError(f'Invalid rate {rate!r}, expected e.g. "5/m" or "20/10m"')
+    count, multiplier, unit = match.groups()
+    seconds = int(multiplier or 1) * PERIODS[unit]
+    return int(count), int(count) / seconds
+
+
+def client_address(request):
+    """Return the client's IP address, or None if it isn't a valid one
+
+    ``X-Forwarded-For`` can be set by anyone, so it is only used when
+    RATELIMIT_TRUSTED_PROXIES says how many proxies in front of us append to
+    it; the address added by the outermost one is taken.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    proxies = settings.RATELIMIT_TRUSTED_PROXIES
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',')]
+        address = hops[-min(proxies, len(hops))]
+    try:
+        return str(ipaddress.ip_address(address))
+    except ValueError:
+        return None
+
+
+def client_key(request):
+    """Identify the client: its address, the /64 network for IPv6"""
+    address = client_address(request)
+    if address is None:
+        return 'unknown'
+    if ipaddress.ip_address(address).version == 6:
+        return str(ipaddress.ip_network(f'{address}/64', strict=False))
+    return address
+
+
+class _LocalBuckets:
+    """Fallback store: buckets in this process's memory"""
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.time():
+                return None
+            return entry[0]
+
+    def set(self, key, value, timeout):
+        now = time.time()
+        with self.lock:
+            if len(self.entries) >= self.MAX_ENTRIES:
+                self.entries = {k: v for k, v in self.entries.items() if v[1] >= now}
+            self.entries[key] = (value, now + timeout)
+
+
+_local = _LocalBuckets()
+_blocked = Counter()
+# Blocked requests not yet added to the shared totals
+_unflushed = Counter()
+_blocked_lock = threading.Lock()
+
+
+def _take(store, key, capacity, refill, now):
+    """Take a token from the bucket at ``key``; return 0, or seconds until one is available"""
+    state = store.get(key)
+    tokens, stamp = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * refill)
+    if tokens < 1:
+        return (1 - tokens) / refill
+    # Unused buckets expire once they would be full again
+    store.set(key, (tokens - 1, now), math.ceil(capacity / refill))
+    return 0
+
+
+def check(request, route, buckets=None):
+    """Take a token from each bucket of ``route``; return 0, or seconds to wait"""
+    if not settings.RATELIMIT_ENABLED:
+        return 0
+    client = client_key(request)
+    now = time.time()
+    for name in buckets or (route,):
+        capacity, refill = parse_rate(settings.RATE_LIMITS[name])
+        key = f'ratelimit:{name}:{client}'
+        try:
+            store = _local if name in LOCAL_ROUTES else caches[settings.RATELIMIT_CACHE]
+            wait = _take(store, key, capacity, refill, now)
+        except Exception:
+            logger.warning('Rate limit cache unavailable, using per-process buckets', exc_info=True)
+            wait = _take(_local, key, capacity, refill, now)
+        if wait:
+            _record_blocked(route)
+            return wait
+    return 0
+
+
+def allow(request, route):
+    """Return True if ``request`` is within the limit of ``route``"""
+    return not check(request, route)
+
+
+def _record_blocked(route):
+    with _blocked_lock:
+        _blocked[route] += 1
+        _unflushed[route] += 1
+
+
+def flush():
+    """Add this worker's new blocked counts to the shared totals"""
+    with _blocked_lock:
+        counts = _unflushed.copy()
+        _unflushed.clear()
+    shared = caches['default']
+    for route, count in counts.items():
+        key = BLOCKED_KEY.format(route)
+        try:
+            shared.add(key, 0, None)
+            shared.incr(key, count)
+        except Exception:
+            with _blocked_lock:
+                _unflushed[route] += count
+
+
+def rate_limit(route, methods=('POST',)):
+    """Decorator: answer 429 to requests beyond the ``route`` and ``writes`` limits
+
+    Only requests using one of ``methods`` are limited.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                wait = check(request, route, (route, WRITES))
+                if wait:
+                    return too_many_requests(request, wait)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def too_many_requests(request, wait):
+    retry_after = max(1, math.ceil(wait))
+    response = render(request, '429.html', {'retry_after': retry_after}, status=429)
+    response['Retry-After'] = retry_after
+    return response
+
+
+def ratelimit_stats():
+    """Blocked request counts: this worker's and all workers' totals"""
+    shared = {}
+    try:
+        totals = caches['default'].get_many(
+            [BLOCKED_KEY.format(route) for route in settings.RATE_LIMITS]
+        )
+        shared = {route: totals.get(BLOCKED_KEY.format(route), 0) for route in settings.RATE_LIMITS}
+    except Exception:
+        pass
+    return {'blocked': dict(_blocked), 'blocked_total': shared}
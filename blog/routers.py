@@ -0,0 +1,67 @@
+"""Database routing for read replicas and the analytics database.
+
+``PrimaryReplicaRouter`` sends reads to one of ``DATABASE_REPLICAS`` only while
+``ReplicaRoutingMiddleware`` has marked the current request as a public read;
+everything else (writes, the admin, management commands, readers who just
+wrote something) stays on ``default``. Models listed in ``ANALYTICS_MODELS``
+live entirely in ``ANALYTICS_DATABASE`` when one is configured.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Allow (or forbid) replica reads for the duration of the block"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def analytics_database():
+    """Return the analytics database alias, or None when it is not split out"""
+    return getattr(settings, 'ANALYTICS_DATABASE', None)
+
+
+def is_analytics_model(model):
+    return model._meta.label_lower in getattr(settings, 'ANALYTICS_MODELS', ())
+
+
+class PrimaryReplicaRouter:
+    """Route public reads to replicas and analytics models to their own database"""
+
+    def db_for_read(self, model, **hints):
+        if analytics_database() and is_analytics_model(model):
+            return analytics_database()
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        if replicas and _replica_reads.get():
+            return random.choice(replicas)
+        # Explicit, so relations followed from an analytics row or a replica
+        # instance outside a public read are fetched from the primary.
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if analytics_database() and is_analytics_model(model):
+            return analytics_database()
+        # Explicit, so instances loaded from a replica are saved to the primary.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, and analytics rows only hold plain ids
+        # of primary rows (their foreign keys have no database constraint).
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', ()):
+            return False
+        if db == analytics_database():
+            return model_name is not None and f'{app_label}.{model_name}' in settings.ANALYTICS_MODELS
+        return None
@@ -52,21 +52,28 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.profiling.ProfilingMiddleware',
+    'blog.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'blog.middleware.ReplicaRoutingMiddleware',
+    'blog.middleware.SurrogateKeyMiddleware',
+    'blog.middleware.SessionlessReadsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.MessagesHintMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.pagecache.PageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'blog.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing render() for blog/metrics.py
+        'BACKEND': 'blog.metrics.TimedDjangoTemplates',
         'DIRS': [
             BASE_DIR / 'templates',
             BASE_DIR / 'templates' / 'admin',
@@ -78,6 +85,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'categories.context_processors.navigation',
             ],
         },
     },
@@ -96,6 +104,116 @@ DATABASES = {
     }
 }
 
+# Read replicas and the analytics database (see blog/routers.py).
+# Aliases in DATABASE_REPLICAS serve public read requests; when
+# ANALYTICS_DATABASE is set, the ANALYTICS_MODELS tables live there.
+DATABASE_ROUTERS = ['blog.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+ANALYTICS_DATABASE = None
+ANALYTICS_MODELS = ['articles.articleview', 'articles.articlereadersketch']
+
+# Readers who just posted a form keep reading from the primary for this long
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = 15
+REPLICA_EXCLUDED_PATHS = ('/admin/',)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# 'default' is shared by all worker processes on a host (file-based; Redis
+# with REDIS_URL in production). The other aliases are two-tier caches
+# (blog/cache.py): a per-process LRU in front of 'default', invalidated across
+# workers through generation stamps. Point any of them at another backend to
+# change how that data is cached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Site navigation (categories/context_processors.py)
+    'nav': {
+        'BACKEND': 'blog.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'KEY_PREFIX': 'nav',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10, 'CHECK_INTERVAL': 5},
+    },
+    # Advertisements on the home page
+    'ads': {
+        'BACKEND': 'blog.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'KEY_PREFIX': 'ads',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10, 'CHECK_INTERVAL': 5},
+    },
+    # Featured articles and latest vlogs on the home page
+    'home': {
+        'BACKEND': 'blog.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'KEY_PREFIX': 'home',
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 10, 'CHECK_INTERVAL': 5},
+    },
+    # Related and popular posts on article pages, one entry per article
+    'detail': {
+        'BACKEND': 'blog.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'KEY_PREFIX': 'detail',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 1000, 'CHECK_INTERVAL': 5},
+    },
+    # Full pages (blog/pagecache.py): big entries, kept apart so they can't
+    # push the shared entries out of 'default'
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PAGE_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'pages')),
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    # Slow query samples (blog/slowqueries.py), one entry per worker
+    'slowqueries': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SLOW_QUERY_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'slowqueries')),
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    # Rate limit buckets (blog/ratelimit.py), in each worker's memory:
+    # read and written on every limited request
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ratelimit',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Request metrics (blog/metrics.py): each worker writes its counters to
+# METRICS_DIR every METRICS_FLUSH_INTERVAL seconds; /metrics merges them.
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / '.metrics'))
+METRICS_FLUSH_INTERVAL = 10
+
+# Slow query log (blog/slowqueries.py): a SLOW_QUERY_SAMPLE_RATE fraction of
+# the queries taking SLOW_QUERY_THRESHOLD seconds or more is kept, the last
+# SLOW_QUERY_BUFFER_SIZE per worker, and shared through the SLOW_QUERY_CACHE
+# cache at each METRICS_FLUSH_INTERVAL. Parameter values are only stored with
+# SLOW_QUERY_LOG_PARAMS (they can hold personal data), otherwise hashed.
+SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.1))
+SLOW_QUERY_SAMPLE_RATE = 0.1
+SLOW_QUERY_BUFFER_SIZE = 500
+SLOW_QUERY_CACHE = 'slowqueries'
+SLOW_QUERY_LOG_PARAMS = False
+
+# Request profiling (blog/profiling.py): staff add ?PROFILE_PARAM=1 to a URL,
+# or send a `manage.py profile_token` token in the X-Profile-Token header.
+# Profiles go to PROFILE_DIR, which keeps the newest PROFILE_KEEP of them.
+# Python hands the GIL over every 5 ms, so CPU-bound code can't be sampled
+# more often than that.
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(BASE_DIR / '.profiles'))
+PROFILE_KEEP = 100
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_INTERVAL = 0.005
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -147,6 +265,18 @@ STATIC_ROOT = BASE_DIR / "staticfiles"     # for collectstatic
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are served by blog/media.py unless MEDIA_SERVE is off (the web server
+# maps MEDIA_URL itself). MEDIA_ACCEL hands the transfer to a front server:
+# 'x-accel-redirect' for nginx (an internal location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or 'x-sendfile' for Apache/lighttpd. Names matching
+# MEDIA_IMMUTABLE_PATTERN (a content hash before the extension) are cached for
+# a year; other uploads for MEDIA_CACHE_MAX_AGE seconds.
+MEDIA_SERVE = True
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 24 * 60 * 60
+MEDIA_IMMUTABLE_PATTERN = r'[._-][0-9a-f]{8,}\.\w+$'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -160,3 +290,115 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 CSRF_TRUSTED_ORIGINS = [
     "https://web-production-bef09.up.railway.app",
 ]
+
+# Store the raw IP address on every ArticleView. Unique readers are counted
+# with HyperLogLog sketches either way, so this can be switched off.
+ARTICLE_VIEW_STORE_IP = os.environ.get('ARTICLE_VIEW_STORE_IP', '1') == '1'
+
+# Reader sketches are buffered in each process and merged into the database
+# at most every TRACKING_FLUSH_INTERVAL seconds (articles/tracking.py).
+# READER_SKETCH_KEY keys the reader hashes (articles/hll.py): keep it secret
+# and never change it, or readers already in the stored sketches are counted
+# again. Sketches written before it existed were keyed with SECRET_KEY.
+TRACKING_FLUSH_INTERVAL = 10
+READER_SKETCH_KEY = os.environ.get('READER_SKETCH_KEY', SECRET_KEY)
+
+# `manage.py archive_views` moves ArticleView rows older than
+# ARTICLE_VIEW_ARCHIVE_AFTER_DAYS days to gzipped CSV files, one per day, in
+# ARTICLE_VIEW_ARCHIVE_DIR (read them with `python -m articles.archive`).
+ARTICLE_VIEW_ARCHIVE_DIR = os.environ.get('ARTICLE_VIEW_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+ARTICLE_VIEW_ARCHIVE_AFTER_DAYS = 180
+
+# Seconds a worker trusts its search suggestion index before replaying
+# changes made by other workers (articles/suggest.py)
+SUGGEST_CHECK_INTERVAL = 5
+
+# PDF export of articles (articles/pdf.py): files are written under
+# MEDIA_ROOT/ARTICLE_PDF_DIR by ARTICLE_PDF_WORKERS render processes per web
+# worker. A render not finished after ARTICLE_PDF_TIMEOUT seconds may be
+# started again by another worker; readers waiting for one retry every
+# ARTICLE_PDF_RETRY_AFTER seconds.
+ARTICLE_PDF_DIR = 'pdf'
+ARTICLE_PDF_WORKERS = int(os.environ.get('ARTICLE_PDF_WORKERS', 1))
+ARTICLE_PDF_TIMEOUT = 120
+ARTICLE_PDF_RETRY_AFTER = 3
+
+# Views from crawlers, monitors and link-preview bots (articles/bots.py) are
+# not counted as reads. BOT_VIEW_POLICY 'count' tallies them in
+# bot_view_count (written every TRACKING_FLUSH_INTERVAL seconds), 'drop'
+# ignores them. BOT_USER_AGENT_TOKENS are extra substrings to match.
+BOT_VIEW_POLICY = 'count'
+BOT_USER_AGENT_TOKENS = []
+
+# Token-bucket rate limits per client (blog/ratelimit.py), as "count/period"
+# with period s, m, h or d, optionally multiplied ("20/10m"). 'writes' caps all
+# limited form posts of a client combined; clients over the 'view' limit get
+# the page but their view isn't recorded. RATELIMIT_TRUSTED_PROXIES is the
+# number of proxies in front of Django that append to X-Forwarded-For (0:
+# use REMOTE_ADDR; production defaults to 1); view tracking reads the client
+# address the same way (blog.ratelimit.client_address). Buckets live in
+# RATELIMIT_CACHE: per worker, unless production shares them in Redis.
+RATELIMIT_ENABLED = True
+RATELIMIT_CACHE = 'ratelimit'
+RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 0))
+RATE_LIMITS = {
+    'writes': '20/h',
+    'comment': '5/10m',
+    'subscribe': '3/h',
+    'contact': '3/h',
+    'view': '60/m',
+}
+
+# Anonymous reads never create a session (blog/middleware.py), and flash
+# messages live in a signed cookie, so the comment and newsletter forms don't
+# write session rows either. The sessions left (the admin's) are stored in the
+# database and read through the cache: the cache alone is culled and, on the
+# file backend, per host, which would log editors out.
+SESSIONLESS_READS = True
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'default'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Full-page cache for anonymous readers (blog/pagecache.py): pages of these
+# views are fresh for PAGE_CACHE_TIMEOUT seconds (or until purged), then
+# served stale while one request renders them again, and kept for
+# PAGE_CACHE_STALE_TIMEOUT seconds to fall back on when the database fails.
+# Only PAGE_CACHE_QUERY_PARAMS are part of the key: list every parameter the
+# cached views read. Search results aren't cached, every query would be a new
+# entry. Hits whose side effects (view counting) find PAGE_CACHE_REPLAY_QUEUE
+# others waiting are served without them.
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_ALIAS = 'pages'
+PAGE_CACHE_QUERY_PARAMS = ('page',)
+# Host headers (with the port, if any) whose pages are cached: any other
+# value would be a new entry, and ALLOWED_HOSTS accepts them all
+PAGE_CACHE_HOSTS = os.environ.get(
+    'PAGE_CACHE_HOSTS', 'localhost,localhost:8000,127.0.0.1,127.0.0.1:8000,testserver'
+).split(',')
+PAGE_CACHE_REPLAY_QUEUE = 1000
+PAGE_CACHE_VIEWS = {
+    'articles:home', 'articles:article_detail', 'articles:about',
+    'articles:contact', 'articles:vlog_detail', 'articles:vlog_list',
+    'categories:category_list', 'categories:category_detail',
+    'authors:author_list', 'authors:author_detail',
+}
+PAGE_CACHE_TIMEOUT = 5 * 60
+PAGE_CACHE_STALE_TIMEOUT = 24 * 60 * 60
+PAGE_CACHE_LOCK_TIMEOUT = 30
+PAGE_CACHE_WAIT = 5
+PAGE_CACHE_CHECK_INTERVAL = 2
+
+# CDN surrogate keys (blog/surrogate.py): the response header carrying them
+# ('Surrogate-Key' for Fastly, 'Cache-Tag' with a ',' separator for
+# Cloudflare) and the backend purges are sent to.
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+SURROGATE_KEY_SEPARATOR = ' '
+SURROGATE_PURGE_BACKEND = {'BACKEND': 'blog.surrogate.LogPurgeBackend'}
+SURROGATE_PURGE_BATCH_SIZE = 256
+
+# Worker warm-up (blog/warmup.py): pages requested once at boot to prime caches
+WARMUP_URLS = ['/']
+WARMUP_TIMEOUT = 10
+
+# Bearer token that lets monitoring agents read /_status/ without a staff login
+MONITORING_TOKEN = os.environ.get('MONITORING_TOKEN', '')
@@ -1,4 +1,5 @@
 from .base import *
+import os
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-774!+z2+5^+v%$#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%'
@@ -31,6 +32,26 @@ DATABASES = {
     }
 }
 
+# Try replica/analytics routing locally with extra SQLite files:
+#   DB_REPLICA=1    adds a "replica" alias on the same file, or on DB_REPLICA_NAME
+#                   (e.g. a copy made with `sqlite3 db.sqlite3 ".backup replica.sqlite3"`)
+#   DB_ANALYTICS=1  moves ArticleView to analytics.sqlite3
+#                   (run `python manage.py migrate --database analytics` once)
+if os.environ.get('DB_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+
+if os.environ.get('DB_ANALYTICS'):
+    DATABASES['analytics'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'analytics.sqlite3',
+    }
+    ANALYTICS_DATABASE = 'analytics'
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
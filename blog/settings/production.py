@@ -3,6 +3,9 @@ import os
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-774!+z2+5^+v%$#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%#x%')
+# Defaults to SECRET_KEY so existing reader sketches stay valid: set it
+# before rotating SECRET_KEY (see base.py)
+READER_SKETCH_KEY = os.environ.get('READER_SKETCH_KEY', SECRET_KEY)
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
@@ -17,6 +20,11 @@ DEBUG = False
 
 ALLOWED_HOSTS = ['*']
 
+# The Procfile deployment (Railway) runs behind one proxy that appends the
+# client address to X-Forwarded-For; REMOTE_ADDR is the proxy's, shared by
+# every visitor. Rate limits and view tracking take the address it added.
+RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 1))
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -28,9 +36,89 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'blog_password'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Ping reused connections before handing them to a request
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas: comma-separated hosts that share the primary's credentials
+DB_REPLICA_HOSTS = [host.strip() for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+for index, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica{index}'] = dict(DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'})
+DATABASE_REPLICAS = [f'replica{index}' for index in range(1, len(DB_REPLICA_HOSTS) + 1)]
+
+# Optional separate database for write-heavy analytics tables (ArticleView)
+if os.environ.get('ANALYTICS_DB_NAME'):
+    DATABASES['analytics'] = dict(
+        DATABASES['default'],
+        NAME=os.environ['ANALYTICS_DB_NAME'],
+        HOST=os.environ.get('ANALYTICS_DB_HOST', DATABASES['default']['HOST']),
+    )
+    ANALYTICS_DATABASE = 'analytics'
+
+# Connection reuse. Each gunicorn worker process runs GUNICORN_THREADS request
+# threads (see gunicorn.conf.py), so each of its pools needs one connection per
+# thread plus one for background work. DB_MAX_CONNECTIONS caps the total: it
+# is shared by the WEB_CONCURRENCY workers and the scheduler process (see the
+# Procfile), each holding one pool per database alias. With DB_POOL=0
+# connections are kept open per thread for DB_CONN_MAX_AGE seconds instead
+# (Django's pool needs CONN_MAX_AGE = 0).
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', '2'))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+DB_PROCESSES = WEB_CONCURRENCY + 1
+DB_POOL_MAX_SIZE = GUNICORN_THREADS + 1
+if os.environ.get('DB_MAX_CONNECTIONS'):
+    DB_POOL_MAX_SIZE = max(1, min(
+        DB_POOL_MAX_SIZE,
+        int(os.environ['DB_MAX_CONNECTIONS']) // (DB_PROCESSES * len(DATABASES)),
+    ))
+
+for database in DATABASES.values():
+    if os.environ.get('DB_POOL', '1') == '1':
+        database['OPTIONS'] = {
+            'pool': {
+                'min_size': min(int(os.environ.get('DB_POOL_MIN_SIZE', '1')), DB_POOL_MAX_SIZE),
+                'max_size': DB_POOL_MAX_SIZE,
+                # Seconds a request waits for a free connection before failing
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),
+                'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '3600')),
+            },
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+
+# Shared cache: Redis (needs the redis package) when REDIS_URL is set,
+# otherwise the file-based cache from base.py
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+    # Rate limits and slow query samples shared by all hosts
+    # (blog/ratelimit.py, blog/slowqueries.py)
+    for alias in ('ratelimit', 'slowqueries'):
+        CACHES[alias] = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+
+# CDN purges: POST the surrogate keys to CDN_PURGE_URL, e.g.
+# https://api.fastly.com/service/<id>/purge with CDN_PURGE_HEADER=Fastly-Key,
+# or Cloudflare's zones/<id>/purge_cache with CDN_PURGE_FIELD=tags,
+# CDN_PURGE_HEADER=Authorization and a "Bearer ..." token.
+if os.environ.get('CDN_PURGE_URL'):
+    SURROGATE_PURGE_BACKEND = {
+        'BACKEND': 'blog.surrogate.HTTPPurgeBackend',
+        'OPTIONS': {
+            'url': os.environ['CDN_PURGE_URL'],
+            'field': os.environ.get('CDN_PURGE_FIELD', 'surrogate_keys'),
+            'headers': {os.environ.get('CDN_PURGE_HEADER', 'Fastly-Key'): os.environ.get('CDN_PURGE_TOKEN', '')},
+        },
+    }
+if os.environ.get('CDN_PURGE_FIELD') == 'tags':
+    SURROGATE_KEY_HEADER, SURROGATE_KEY_SEPARATOR = 'Cache-Tag', ','
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
@@ -68,3 +156,8 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 CSRF_TRUSTED_ORIGINS = [
     "https://web-production-bef09.up.railway.app",
 ]
+
+# Only the site's own hosts get full-page caching (see base.py)
+PAGE_CACHE_HOSTS = os.environ.get(
+    'PAGE_CACHE_HOSTS', ','.join(origin.split('://', 1)[1] for origin in CSRF_TRUSTED_ORIGINS)
+).split(',')
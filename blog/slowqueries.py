@@ -0,0 +1,195 @@
+"""Sampled log of slow database queries.
+
+The metrics execute wrapper (blog/metrics.py) hands every query of a request
+that took at least ``SLOW_QUERY_THRESHOLD`` seconds to ``record``, which keeps
+a ``SLOW_QUERY_SAMPLE_RATE`` fraction of them. Each sample holds the
+normalized statement (literals and ``IN`` lists replaced), the parameters,
+the duration, the view, the innermost template node being rendered and the
+project code that ran the query. Parameters are stored as their type and a
+keyed hash (equal values hash alike) unless ``SLOW_QUERY_LOG_PARAMS`` is on,
+as they can hold personal data.
+
+``record`` only appends to a buffer of the last ``SLOW_QUERY_BUFFER_SIZE``
+samples in the worker's memory. ``flush``, called with the metrics flush
+after a response, writes that buffer to the ``SLOW_QUERY_CACHE`` cache under
+the worker's own key and lists the key in a registry, so workers never
+overwrite each other's samples. ``/admin/slow-queries/`` reads every
+worker's buffer and groups the samples by statement.
+"""
+import hashlib
+import logging
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+logger = logging.getLogger(__name__)
+
+WRITERS_KEY = 'slowq:writers'
+SAMPLES_KEY = 'slowq:samples:{}'
+CLEARED_KEY = 'slowq:cleared'
+SAMPLES_TIMEOUT = 7 * 24 * 60 * 60
+MAX_PARAMS = 20
+MAX_PARAM_LENGTH = 200
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+# This worker's latest samples, and whether they changed since the flush
+_buffer = {'samples': deque(), 'dirty': False}
+_lock = threading.Lock()
+
+_ROOT = str(Path(__file__).resolve().parent.parent) + os.sep
+_SKIPPED_FILES = {__file__, str(Path(__file__).with_name('metrics.py'))}
+
+
+def normalize(sql):
+    """Return ``sql`` with literals and placeholders replaced by ``?``"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _redact(param):
+    key = settings.SECRET_KEY.encode()[:64]
+    digest = hashlib.blake2b(repr(param).encode(), digest_size=4, key=key).hexdigest()
+    return f'<{type(param).__name__}:{digest}>'
+
+
+def _params(params):
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        params = list(params.values())
+    if settings.SLOW_QUERY_LOG_PARAMS:
+        return [repr(param)[:MAX_PARAM_LENGTH] for param in list(params)[:MAX_PARAMS]]
+    return [_redact(param) for param in list(params)[:MAX_PARAMS]]
+
+
+def where(frame):
+    """Return ``(template, code)``: the template node and project line running a query"""
+    template = code = None
+    while frame is not None and not (template and code):
+        co = frame.f_code
+        if template is None and co.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            if origin is not None:
+                token = getattr(node, 'token', None)
+                template = f'{origin.template_name or origin.name}:{getattr(token, "lineno", "?")}'
+        if code is None:
+            filename = co.co_filename
+            if (
+                filename.startswith(_ROOT)
+                and 'site-packages' not in filename
+                and filename not in _SKIPPED_FILES
+            ):
+                code = f'{filename[len(_ROOT):]}:{frame.f_lineno} in {co.co_name}'
+        frame = frame.f_back
+    return template, code
+
+
+def record(sql, params, seconds, view):
+    """Keep a sample of a slow query, if it is one and the sampler picks it"""
+    if seconds < settings.SLOW_QUERY_THRESHOLD or random.random() >= settings.SLOW_QUERY_SAMPLE_RATE:
+        return
+    template, code = where(sys._getframe(1))
+    sample = {
+        'sql': normalize(sql),
+        'params': _params(params),
+        'seconds': seconds,
+        'view': view,
+        'template': template,
+        'code': code,
+        'at': time.time(),
+    }
+    logger.info('Slow query (%.0f ms) in %s: %s', seconds * 1000, view, sample['sql'][:200])
+    with _lock:
+        if _buffer['samples'].maxlen != settings.SLOW_QUERY_BUFFER_SIZE:
+            _buffer['samples'] = deque(_buffer['samples'], maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        _buffer['samples'].append(sample)
+        _buffer['dirty'] = True
+
+
+# Sharing between workers
+
+def _writer():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def flush():
+    """Write this worker's samples to the shared cache, if any are new"""
+    with _lock:
+        if not _buffer['dirty']:
+            return
+        buffered = list(_buffer['samples'])
+        _buffer['dirty'] = False
+    cache = caches[settings.SLOW_QUERY_CACHE]
+    writer = _writer()
+    try:
+        cache.set(SAMPLES_KEY.format(writer), buffered, SAMPLES_TIMEOUT)
+        writers = cache.get(WRITERS_KEY) or {}
+        oldest = time.time() - SAMPLES_TIMEOUT
+        writers = {name: stamp for name, stamp in writers.items() if stamp > oldest}
+        writers[writer] = time.time()
+        cache.set(WRITERS_KEY, writers, SAMPLES_TIMEOUT)
+    except Exception:
+        with _lock:
+            _buffer['dirty'] = True
+        logger.warning('Could not store the slow query samples', exc_info=True)
+
+
+def samples():
+    """Return the samples of all workers, newest first"""
+    flush()
+    cache = caches[settings.SLOW_QUERY_CACHE]
+    writers = cache.get(WRITERS_KEY) or {}
+    buffers = cache.get_many([SAMPLES_KEY.format(writer) for writer in writers] + [CLEARED_KEY])
+    cleared = buffers.pop(CLEARED_KEY, 0)
+    found = [sample for buffered in buffers.values() for sample in buffered if sample['at'] > cleared]
+    return sorted(found, key=lambda sample: sample['at'], reverse=True)
+
+
+def worst_statements(limit=50):
+    """Group the samples by statement, most total time first"""
+    groups = {}
+    for sample in samples():
+        group = groups.get(sample['sql'])
+        if group is None:
+            # Samples come newest first: the first one is the latest example
+            group = groups[sample['sql']] = {
+                'sql': sample['sql'], 'count': 0, 'total': 0.0, 'max': 0.0,
+                'views': set(), 'templates': set(), 'code': set(), 'latest': sample,
+            }
+        group['count'] += 1
+        group['total'] += sample['seconds']
+        group['max'] = max(group['max'], sample['seconds'])
+        group['views'].add(sample['view'] or '-')
+        for field, source in (('templates', 'template'), ('code', 'code')):
+            if sample[source]:
+                group[field].add(sample[source])
+    for group in groups.values():
+        group['mean'] = group['total'] / group['count']
+        for field in ('views', 'templates', 'code'):
+            group[field] = sorted(group[field])
+    return sorted(groups.values(), key=lambda group: group['total'], reverse=True)[:limit]
+
+
+def clear():
+    """Hide the samples taken so far, in every worker"""
+    with _lock:
+        _buffer['samples'].clear()
+    caches[settings.SLOW_QUERY_CACHE].set(CLEARED_KEY, time.time(), SAMPLES_TIMEOUT)
@@ -0,0 +1,85 @@
+// Per-visitor parts of the (shared, cacheable) pages: the CSRF token of the
+// forms and pending flash messages, fetched from /_personalize/.
+//
+// The token is only requested once a reader starts filling in a form, and the
+// messages only when the pending_messages cookie says there are some.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('messages');
+    if (!container) {
+        return;
+    }
+
+    const url = container.dataset.personalizeUrl;
+    const tokenSelector = 'input[name="csrfmiddlewaretoken"]';
+    let pending = null;
+
+    function showMessages(messages) {
+        messages.forEach(function(message) {
+            const alert = document.createElement('div');
+            alert.className = 'alert alert-' + message.tags + ' alert-dismissible fade show';
+            alert.setAttribute('role', 'alert');
+            alert.textContent = message.text;
+
+            const close = document.createElement('button');
+            close.type = 'button';
+            close.className = 'btn-close';
+            close.setAttribute('data-bs-dismiss', 'alert');
+            close.setAttribute('aria-label', 'Close');
+            alert.appendChild(close);
+            container.appendChild(alert);
+        });
+        if (messages.length) {
+            container.hidden = false;
+        }
+    }
+
+    function personalize() {
+        if (!pending) {
+            pending = fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+                .then(function(response) {
+                    if (!response.ok) {
+                        throw new Error(response.status);
+                    }
+                    return response.json();
+                })
+                .then(function(data) {
+                    document.querySelectorAll(tokenSelector).forEach(function(field) {
+                        field.value = data.csrf_token;
+                    });
+                    showMessages(data.messages);
+                    return data;
+                })
+                .catch(function() {
+                    // Try again on the next interaction
+                    pending = null;
+                });
+        }
+        return pending;
+    }
+
+    if (document.cookie.split('; ').some(function(cookie) { return cookie.indexOf('pending_messages=') === 0; })) {
+        personalize();
+    }
+
+    document.addEventListener('focusin', function(event) {
+        const form = event.target.form;
+        if (form && form.querySelector(tokenSelector)) {
+            personalize();
+        }
+    });
+
+    document.addEventListener('submit', function(event) {
+        const form = event.target;
+        const field = form.querySelector(tokenSelector);
+        if (!field || field.value) {
+            return;
+        }
+        event.preventDefault();
+        personalize().then(function() {
+            if (field.value) {
+                form.submit();
+            }
+        });
+    });
+});
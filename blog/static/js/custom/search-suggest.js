@@ -0,0 +1,92 @@
+// Search-as-you-type suggestions for the navbar search box
+
+document.addEventListener('DOMContentLoaded', function() {
+    const input = document.querySelector('input[data-suggest-url]');
+    const list = document.getElementById('searchSuggestions');
+    if (!input || !list) {
+        return;
+    }
+
+    const url = input.dataset.suggestUrl;
+    const labels = { article: 'Article', vlog: 'Vlog', category: 'Category', author: 'Author' };
+    let timer = null;
+    let controller = null;
+    let active = -1;
+
+    function hide() {
+        list.classList.remove('show');
+        list.innerHTML = '';
+        active = -1;
+    }
+
+    function render(results) {
+        list.innerHTML = '';
+        active = -1;
+        if (!results.length) {
+            hide();
+            return;
+        }
+        results.forEach(function(result) {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            link.className = 'dropdown-item d-flex justify-content-between';
+            link.href = result.url;
+            link.textContent = result.label;
+            const kind = document.createElement('small');
+            kind.className = 'text-muted ms-3';
+            kind.textContent = labels[result.kind] || result.kind;
+            link.appendChild(kind);
+            item.appendChild(link);
+            list.appendChild(item);
+        });
+        list.classList.add('show');
+    }
+
+    function fetchSuggestions() {
+        const query = input.value.trim();
+        if (query.length < 2) {
+            hide();
+            return;
+        }
+        // Only the latest keystroke's request matters
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        fetch(url + '?q=' + encodeURIComponent(query), { signal: controller.signal })
+            .then(function(response) { return response.json(); })
+            .then(function(data) { render(data.results); })
+            .catch(function() {});
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(fetchSuggestions, 120);
+    });
+
+    // Arrow keys move through the suggestions, Enter opens the selected one
+    input.addEventListener('keydown', function(event) {
+        const links = list.querySelectorAll('a');
+        if (!links.length) {
+            return;
+        }
+        if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+            event.preventDefault();
+            active = (active + (event.key === 'ArrowDown' ? 1 : -1) + links.length) % links.length;
+            links.forEach(function(link, index) {
+                link.classList.toggle('active', index === active);
+            });
+        } else if (event.key === 'Enter' && active >= 0) {
+            event.preventDefault();
+            window.location = links[active].href;
+        } else if (event.key === 'Escape') {
+            hide();
+        }
+    });
+
+    document.addEventListener('click', function(event) {
+        if (!list.contains(event.target) && event.target !== input) {
+            hide();
+        }
+    });
+});
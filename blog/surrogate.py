@@ -0,0 +1,158 @@
+"""Surrogate keys for CDN caching, and targeted purges.
+
+Public views tag the request with what they rendered (``tag``): single
+objects as ``<model>:<pk>`` (``article:12``, ``author:3``) and lists as a
+plural key (``articles``, ``vlogs``, ``categories``, ``authors``, ``ads``).
+Every tagged response also gets ``site``. ``SurrogateKeyMiddleware`` puts the
+keys in the ``SURROGATE_KEY_HEADER`` response header, which the CDN indexes
+and strips.
+
+When content changes, ``purge`` (called from ``articles/receivers.py`` and
+the admin actions that update in bulk) queues the affected keys. Once the
+transaction commits they are handed to a background thread, so the request
+doesn't wait for the CDN, and sent in batches of
+``SURROGATE_PURGE_BATCH_SIZE`` to the backend configured in
+``SURROGATE_PURGE_BACKEND``:
+
+- ``LogPurgeBackend`` logs the keys (and appends them to ``path`` if given);
+  use it in development and to see what would be purged.
+- ``HTTPPurgeBackend`` POSTs ``{"<field>": [keys]}`` to ``url``, which is the
+  bulk purge API of Fastly (``surrogate_keys``) and Cloudflare (``tags``).
+"""
+import json
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+SITE_KEY = 'site'
+LIST_KEYS = {
+    'article': 'articles',
+    'vlog': 'vlogs',
+    'category': 'categories',
+    'author': 'authors',
+    'advertisement': 'ads',
+}
+
+
+def keys_for(model, pks):
+    """Return the keys of the ``model`` rows with primary keys ``pks``"""
+    return [f'{model._meta.model_name}:{pk}' for pk in pks]
+
+
+def list_key(model):
+    return LIST_KEYS[model._meta.model_name]
+
+
+def _object_keys(obj):
+    keys = keys_for(type(obj), [obj.pk])
+    # Articles and vlogs show their author and category
+    for field in ('author', 'category'):
+        pk = getattr(obj, f'{field}_id', None)
+        if pk is not None:
+            keys.append(f'{field}:{pk}')
+    return keys
+
+
+def tag(request, *items):
+    """Add surrogate keys (strings) or the keys of model instances to ``request``"""
+    keys = request.__dict__.setdefault('surrogate_keys', set())
+    for item in items:
+        if isinstance(item, str):
+            keys.add(item)
+        elif item is not None:
+            keys.update(_object_keys(item))
+
+
+def header_value(request):
+    keys = getattr(request, 'surrogate_keys', None)
+    if not keys:
+        return None
+    return settings.SURROGATE_KEY_SEPARATOR.join(sorted(keys | {SITE_KEY}))
+
+
+# Purging
+
+class LogPurgeBackend:
+    """Log the purged keys, optionally appending them to a file"""
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def purge(self, keys):
+        logger.info('Purge %s', ' '.join(keys))
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as log:
+                log.write(f"{timezone.now().isoformat()} {' '.join(keys)}\n")
+
+
+class HTTPPurgeBackend:
+    """POST the keys as JSON to a CDN's purge API"""
+
+    def __init__(self, url, field='surrogate_keys', headers=None, timeout=5):
+        self.url = url
+        self.field = field
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.timeout = timeout
+
+    def purge(self, keys):
+        body = json.dumps({self.field: list(keys)}).encode()
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+_backend = None
+_pending = threading.local()
+# One thread sends the purges in order; waited for at interpreter exit
+_sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix='surrogate-purge')
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = settings.SURROGATE_PURGE_BACKEND
+        _backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def purge(*keys, using=None):
+    """Purge ``keys`` from the CDN when the current transaction commits
+
+    Keys queued during one transaction are sent together. Keys of a
+    transaction that rolled back go out with the next purge, which costs a
+    few cache misses at worst.
+    """
+    pending = _pending.__dict__.setdefault('keys', set())
+    pending.update(keys)
+    transaction.on_commit(_flush, using=using)
+
+
+def _flush():
+    keys = sorted(getattr(_pending, 'keys', ()))
+    _pending.keys = set()
+    if keys:
+        from .pagecache import expire
+        expire(keys)
+        _sender.submit(send, keys)
+
+
+def send(keys):
+    """Send ``keys`` to the purge backend now, in batches"""
+    backend = get_backend()
+    size = settings.SURROGATE_PURGE_BATCH_SIZE
+    for start in range(0, len(keys), size):
+        batch = keys[start:start + size]
+        try:
+            backend.purge(batch)
+        except Exception:
+            # The entries still expire with their TTL
+            logger.exception('Purging %d surrogate keys failed', len(batch))
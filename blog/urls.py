@@ -13,20 +13,30 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from . import media, views
 
 urlpatterns = [
+    path('admin/slow-queries/', admin.site.admin_view(views.slow_queries), name='slow_queries'),
+    path('admin/profiles/', admin.site.admin_view(views.profiles), name='profiles'),
+    path('admin/profiles/<str:name>', admin.site.admin_view(views.download_profile), name='download_profile'),
     path('admin/', admin.site.urls),
     path('', include('articles.urls')),
     path('authors/', include('authors.urls')),
     path('categories/', include('categories.urls')),
     path('comments/', include('comments.urls')),
     path('newsletter/', include('newsletter.urls')),
+    path('_personalize/', views.personalize, name='personalize'),
+    path('_status/', views.status, name='status'),
+    path('metrics', views.metrics, name='metrics'),
 ]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Serve uploads (blog/media.py), unless MEDIA_URL points at another host
+if settings.MEDIA_SERVE and settings.MEDIA_URL.startswith('/'):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), media.serve_media, name='media'),
+    ]
\ No newline at end of file
@@ -0,0 +1,105 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.middleware.csrf import get_token
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from .cache import cache_stats
+from . import profiling, slowqueries
+from .db import pool_stats
+from .metrics import metrics_response
+from .middleware import MESSAGES_HINT_COOKIE
+from .pagecache import replay_stats
+from .ratelimit import ratelimit_stats
+
+
+def monitoring_view(view_func):
+    """Allow staff users, or monitoring agents sending MONITORING_TOKEN as a bearer token"""
+    staff_view = staff_member_required(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        token = settings.MONITORING_TOKEN
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if token and constant_time_compare(header, f'Bearer {token}'):
+            return view_func(request, *args, **kwargs)
+        return staff_view(request, *args, **kwargs)
+
+    return never_cache(wrapper)
+
+
+@never_cache
+def personalize(request):
+    """Return the per-visitor parts of the public pages as JSON
+
+    Pages are the same for every anonymous reader so they can be cached;
+    ``static/js/custom/personalize.js`` fetches the CSRF token for their forms
+    and any pending flash messages from here.
+    """
+    response = JsonResponse({
+        'csrf_token': get_token(request),
+        'messages': [
+            {'tags': message.tags, 'text': str(message)}
+            for message in messages.get_messages(request)
+        ],
+    })
+    if MESSAGES_HINT_COOKIE in request.COOKIES:
+        response.delete_cookie(MESSAGES_HINT_COOKIE)
+    return response
+
+
+@monitoring_view
+def status(request):
+    """Report this worker's runtime statistics as JSON"""
+    return JsonResponse({
+        'db_pools': pool_stats(),
+        'caches': cache_stats(),
+        'rate_limits': ratelimit_stats(),
+        'page_cache_replays': replay_stats(),
+    })
+
+
+@monitoring_view
+def metrics(request):
+    """Expose the request metrics of all workers in the Prometheus text format"""
+    return metrics_response()
+
+
+def slow_queries(request):
+    """Admin page: the sampled slow queries grouped by statement"""
+    if request.method == 'POST':
+        slowqueries.clear()
+        return redirect('slow_queries')
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Slow queries',
+        'statements': slowqueries.worst_statements(),
+        'threshold_ms': settings.SLOW_QUERY_THRESHOLD * 1000,
+        'sample_rate': settings.SLOW_QUERY_SAMPLE_RATE,
+    }
+    return TemplateResponse(request, 'admin/slow_queries.html', context)
+
+
+def profiles(request):
+    """Admin page: the stored request profiles"""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': profiling.profiles(),
+        'param': settings.PROFILE_PARAM,
+    }
+    return TemplateResponse(request, 'admin/profiles.html', context)
+
+
+def download_profile(request, name):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise Http404('No such profile')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name, content_type='text/plain')
@@ -0,0 +1,150 @@
+"""Warm a worker up before it serves its first request.
+
+Without this, the first requests handled by each new gunicorn worker pay for
+compiling templates, building the URL resolver, opening database connections
+and filling the caches. ``warm_up`` does that work up front; gunicorn.conf.py
+calls it from the master (with ``--preload``) and from every new worker.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import URLPattern, URLResolver, get_resolver
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def _template_names(engine):
+    """Yield the name of every template the engine's loaders can find"""
+    seen = set()
+    loaders = []
+    for loader in engine.template_loaders:
+        loaders.extend(getattr(loader, 'loaders', [loader]))
+    for loader in loaders:
+        for directory in loader.get_dirs():
+            for root, _dirs, files in os.walk(directory):
+                for filename in files:
+                    if not filename.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                    if name not in seen:
+                        seen.add(name)
+                        yield name
+
+
+def warm_templates():
+    """Compile every project and app template into the cached loader"""
+    compiled = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for name in _template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+                # Partials of third-party apps may need libraries we don't load.
+                logger.debug('Skipped template %s: %s', name, exc)
+            else:
+                compiled += 1
+    return compiled
+
+
+def _walk_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        # Route regexes are compiled lazily on first access.
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            yield from _walk_patterns(pattern)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def warm_urls():
+    """Import every URLconf, compile every route and build the reverse maps"""
+    resolver = get_resolver()
+    count = sum(1 for _ in _walk_patterns(resolver))
+    resolver.reverse_dict
+    for namespace, (_prefix, sub_resolver) in resolver.namespace_dict.items():
+        sub_resolver.reverse_dict
+    return count
+
+
+def warm_connections():
+    """Open the database connections (or fill the connection pools)"""
+    opened = 0
+    for alias in connections:
+        connection = connections[alias]
+        try:
+            pool = getattr(connection, 'pool', None)
+            if pool is not None:
+                pool.open(wait=True, timeout=settings.WARMUP_TIMEOUT)
+            else:
+                connection.ensure_connection()
+        except Exception:
+            logger.exception('Could not open database connection %r during warm-up', alias)
+        else:
+            opened += 1
+    return opened
+
+
+def warm_search():
+    """Build the search suggestion index (articles/suggest.py)"""
+    from articles.suggest import get_index
+
+    try:
+        return len(get_index())
+    except Exception:
+        logger.exception('Could not build the search suggestion index during warm-up')
+        return 0
+
+
+def warm_pages():
+    """Request WARMUP_URLS through the full stack to prime the caches"""
+    from django.test import Client
+
+    client = Client()
+    host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')), 'localhost')
+    rendered = 0
+    for url in settings.WARMUP_URLS:
+        try:
+            response = client.get(url, secure=True, HTTP_HOST=host)
+        except Exception:
+            logger.exception('Warm-up request to %s failed', url)
+            continue
+        if response.status_code == 200:
+            rendered += 1
+        else:
+            logger.warning('Warm-up request to %s returned %s', url, response.status_code)
+    return rendered
+
+
+def warm_up(templates=True, urls=True, connect=True, pages=True):
+    """Run the selected warm-up steps and return ``[(step, count, seconds)]``
+
+    ``connect`` and ``pages`` must only run after the worker has forked, so
+    connections are never shared between processes.
+    """
+    steps = []
+    if templates:
+        steps.append(('templates', warm_templates))
+    if urls:
+        steps.append(('urls', warm_urls))
+    if connect:
+        steps.append(('connections', warm_connections))
+    if connect and pages:
+        steps.append(('search', warm_search))
+        steps.append(('pages', warm_pages))
+
+    timings = []
+    for name, step in steps:
+        start = time.perf_counter()
+        count = step()
+        timings.append((name, count, time.perf_counter() - start))
+    return timings
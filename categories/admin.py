@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count, Q
 from .models import Category
 
 
@@ -11,7 +12,14 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     ordering = ('order', 'name')
     
+    def get_queryset(self, request):
+        """Count published articles in the list query rather than once per row"""
+        return super().get_queryset(request).annotate(
+            published_articles=Count('articles', filter=Q(articles__is_published=True)),
+        )
+    
     def article_count(self, obj):
         """Display the number of articles in this category"""
-        return obj.article_count()
-    article_count.short_description = 'Articles'
\ No newline at end of file
+        return obj.published_articles
+    article_count.short_description = 'Articles'
+    article_count.admin_order_field = 'published_articles'
\ No newline at end of file
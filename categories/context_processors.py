@@ -0,0 +1,56 @@
+"""Site navigation for every page rendered from base.html.
+
+The active categories (with their published article counts) and the footer
+links are kept in the two-tier ``nav`` cache (blog/cache.py), so requests are
+normally served from process memory without touching the database. Category
+and article changes call ``invalidate_navigation`` (see
+``categories/signals.py``), which starts a new cache generation that every
+worker picks up within the alias's ``CHECK_INTERVAL``.
+"""
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.urls import reverse
+
+from blog.surrogate import tag
+
+from .models import Category
+
+
+NAV_CACHE_KEY = 'navigation'
+
+FOOTER_LINKS = (
+    ('Home', 'articles:home'),
+    ('Categories', 'categories:category_list'),
+    ('Authors', 'authors:author_list'),
+    ('About', 'articles:about'),
+    ('Contact', 'articles:contact'),
+)
+
+
+def build_navigation():
+    """Load the navigation data: one query, counts included"""
+    categories = list(
+        Category.objects.filter(is_active=True)
+        .annotate(published_count=Count('articles', filter=Q(articles__is_published=True)))
+        .order_by('order', 'name')
+    )
+    return {
+        'nav_categories': categories,
+        'nav_footer_links': [(label, reverse(name)) for label, name in FOOTER_LINKS],
+    }
+
+
+def get_navigation():
+    """Return the cached navigation, building it on a miss"""
+    return caches['nav'].get_or_set(NAV_CACHE_KEY, build_navigation)
+
+
+def invalidate_navigation(**kwargs):
+    """Make every worker rebuild the navigation on its next request"""
+    caches['nav'].clear()
+
+
+def navigation(request):
+    """Context processor: ``nav_categories`` and ``nav_footer_links``"""
+    tag(request, 'categories')
+    return get_navigation()
@@ -0,0 +1,24 @@
+"""Keep the cached site navigation in step with categories and articles."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from articles.models import Article
+from articles.signals import content_changed
+
+from .context_processors import invalidate_navigation
+from .models import Category
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def category_or_article_changed(sender, **kwargs):
+    # view_count updates go through queryset.update() and don't get here.
+    invalidate_navigation()
+
+
+@receiver(content_changed)
+def content_bulk_changed(sender, **kwargs):
+    if sender is Article or sender is Category:
+        invalidate_navigation()
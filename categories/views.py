@@ -1,12 +1,16 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
+from .context_processors import get_navigation
 from .models import Category
 from articles.models import Article
+from blog.surrogate import tag
 
 
 def category_list(request):
     """Display a list of all categories"""
-    categories = Category.objects.filter(is_active=True).order_by('order', 'name')
+    # Same list (with published counts) as the navigation menu
+    categories = get_navigation()['nav_categories']
+    tag(request, 'categories')
     
     context = {
         'categories': categories,
@@ -19,15 +23,16 @@ def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug, is_active=True)
     
     # Get published articles in this category
-    articles = Article.objects.filter(
-        category=category,
-        is_published=True
+    articles = Article.objects.published().cards().filter(
+        category=category
     ).order_by('-published_date')
     
     # Pagination
     paginator = Paginator(articles, 10)  # Show 10 articles per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+
+    tag(request, 'articles', category, *page_obj)
     
     context = {
         'category': category,
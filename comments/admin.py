@@ -1,24 +1,42 @@
 from django.contrib import admin
+from articles.models import Article
+from blog.exports import CSVExportMixin
+from blog.pagination import EstimatedCountPaginator
+from blog.surrogate import keys_for, purge
 from .models import Comment
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(CSVExportMixin, admin.ModelAdmin):
     """Admin interface for Comment model"""
     list_display = ('author_name', 'article', 'is_approved', 'created_date')
     list_filter = ('is_approved', 'created_date', 'article__category')
+    list_select_related = ('article',)
+    date_hierarchy = 'created_date'
     search_fields = ('author_name', 'author_email', 'content')
+    autocomplete_fields = ('article',)
     readonly_fields = ('created_date', 'ip_address')
-    actions = ['approve_comments', 'disapprove_comments']
+    # pk in the same direction as created_date, so the index serves the ordering
+    ordering = ('created_date', 'pk')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/large_change_list.html'
+    actions = ['approve_comments', 'disapprove_comments', 'export_csv']
+    export_fields = (
+        'id', 'article_id', 'article__title', 'author_name', 'author_email',
+        'content', 'is_approved', 'created_date', 'ip_address',
+    )
     
     def approve_comments(self, request, queryset):
         """Approve selected comments"""
         updated = queryset.update(is_approved=True)
+        purge(*keys_for(Article, set(queryset.values_list('article_id', flat=True))))
         self.message_user(request, f'{updated} comments were successfully approved.')
     approve_comments.short_description = "Approve selected comments"
     
     def disapprove_comments(self, request, queryset):
         """Disapprove selected comments"""
         updated = queryset.update(is_approved=False)
+        purge(*keys_for(Article, set(queryset.values_list('article_id', flat=True))))
         self.message_user(request, f'{updated} comments were successfully disapproved.')
     disapprove_comments.short_description = "Disapprove selected comments"
\ No newline at end of file
@@ -17,6 +17,10 @@ class Comment(models.Model):
     class Meta:
         ordering = ['created_date']
         verbose_name_plural = "Comments"
+        indexes = [
+            # Date filters, date_hierarchy and the admin's ordering
+            models.Index(fields=['created_date', 'id'], name='comment_created_idx'),
+        ]
     
     def __str__(self):
         return f'Comment by {self.author_name} on {self.article.title}'
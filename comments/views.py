@@ -3,8 +3,10 @@ from django.contrib import messages
 from django.urls import reverse
 from .models import Comment
 from articles.models import Article
+from blog.ratelimit import rate_limit
 
 
+@rate_limit('comment')
 def add_comment(request, article_slug):
     """Add a comment to an article"""
     article = get_object_or_404(Article, slug=article_slug, is_published=True)
@@ -0,0 +1,49 @@
+"""Gunicorn configuration, picked up automatically from the project root.
+
+Worker processes come from WEB_CONCURRENCY (read by gunicorn itself) and each
+runs GUNICORN_THREADS request threads; blog/settings/production.py sizes the
+per-worker database pool from the same variables.
+
+New workers are warmed up (templates, URL resolver, database connections,
+WARMUP_URLS) before they accept requests; set WARMUP=0 to skip that. With
+GUNICORN_PRELOAD=1 the app is imported once in the master and templates and
+URLs are warmed there, so forked workers inherit them.
+"""
+import os
+
+
+threads = int(os.environ.get('GUNICORN_THREADS', '2'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+warmup = os.environ.get('WARMUP', '1') == '1'
+
+
+def _log_timings(log, who, timings):
+    for step, count, seconds in timings:
+        log.info('%s warm-up: %s (%d) in %.1f ms', who, step, count, seconds * 1000)
+
+
+def when_ready(server):
+    if warmup and preload_app:
+        from blog.warmup import warm_up
+        # No database work before forking: connections must not be shared.
+        _log_timings(server.log, 'Master', warm_up(connect=False))
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's request counts in /metrics (blog/metrics.py)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings.development')
+    from blog.metrics import retire_worker
+    retire_worker(worker.pid)
+
+
+def worker_exit(server, worker):
+    # Save the reader sketches buffered by this worker (articles/tracking.py)
+    from articles.tracking import flush
+    flush()
+
+
+def post_worker_init(worker):
+    if warmup:
+        from blog.warmup import warm_up
+        timings = warm_up(templates=not preload_app, urls=not preload_app)
+        _log_timings(worker.log, f'Worker {worker.pid}', timings)
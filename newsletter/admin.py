@@ -1,4 +1,5 @@
 from django.contrib import admin
+from blog.exports import CSVExportMixin
 from .models import NewsletterSubscriber, NewsletterPreference
 
 
@@ -10,14 +11,15 @@ class NewsletterPreferenceInline(admin.StackedInline):
 
 
 @admin.register(NewsletterSubscriber)
-class NewsletterSubscriberAdmin(admin.ModelAdmin):
+class NewsletterSubscriberAdmin(CSVExportMixin, admin.ModelAdmin):
     """Admin interface for NewsletterSubscriber model"""
     list_display = ('email', 'full_name', 'is_active', 'subscribed_date')
     list_filter = ('is_active', 'subscribed_date')
     search_fields = ('email', 'first_name', 'last_name')
     readonly_fields = ('subscribed_date', 'unsubscribed_date')
     inlines = [NewsletterPreferenceInline]
-    actions = ['activate_subscribers', 'deactivate_subscribers']
+    actions = ['activate_subscribers', 'deactivate_subscribers', 'export_csv']
+    export_fields = ('email', 'first_name', 'last_name', 'is_active', 'subscribed_date', 'unsubscribed_date')
     
     def activate_subscribers(self, request, queryset):
         """Activate selected subscribers"""
@@ -37,4 +39,5 @@ class NewsletterPreferenceAdmin(admin.ModelAdmin):
     """Admin interface for NewsletterPreference model"""
     list_display = ('subscriber', 'receive_weekly', 'receive_monthly', 'receive_events', 'receive_food', 'receive_spots')
     list_filter = ('receive_weekly', 'receive_monthly', 'receive_events', 'receive_food', 'receive_spots')
+    list_select_related = ('subscriber',)
     search_fields = ('subscriber__email', 'subscriber__first_name', 'subscriber__last_name')
\ No newline at end of file
@@ -1,8 +1,10 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from blog.ratelimit import rate_limit
 from .models import NewsletterSubscriber, NewsletterPreference
 
 
+@rate_limit('subscribe')
 def subscribe(request):
     """Subscribe to the newsletter"""
     if request.method == 'POST':